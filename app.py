@@ -7,6 +7,7 @@ except ImportError:
 import streamlit as st
 import os
 import time
+from collections import deque
 from datetime import datetime
 from dotenv import load_dotenv
 from src.document_processor import SalesforceDocumentProcessor
@@ -14,6 +15,7 @@ from src.rag_system import SalesforceRAGSystem
 from src.monitoring import monitor, track_query
 from src.rate_limiter import rate_limiter
 from src.input_validator import validator
+from src.token_tracker import MAX_DETAILED_CALLS
 
 # New imports for conversation history
 from src.conversation_history import conversation_history
@@ -58,7 +60,7 @@ if 'token_usage' not in st.session_state:
         'query_count': 0,
         'model_usage': {},
         'session_start': datetime.now().isoformat(),
-        'detailed_calls': []
+        'detailed_calls': deque(maxlen=MAX_DETAILED_CALLS)
     }
 
 def initialize_rag_system():
@@ -81,7 +83,11 @@ def initialize_rag_system():
         try:
             with st.spinner("📂 Loading existing knowledge base..."):
                 rag_system.load_vectorstore()
+                updated_count = rag_system.incremental_update(pdf_directory)
                 info = rag_system.get_collection_info()
+                
+                if updated_count:
+                    st.info(f"🔄 Re-indexed {updated_count} changed PDF(s)")
             
                 pdf_count = len([f for f in os.listdir(pdf_directory) if f.endswith('.pdf')])
                 success_msg = st.success(f"✅ Loaded knowledge base: {pdf_count} documents, {info['count']} chunks")
@@ -98,15 +104,10 @@ def initialize_rag_system():
         st.info("📚 Creating initial knowledge base from PDFs (first time only)...")
     
     try:
-        with st.spinner(f"📄 Processing {len(pdf_files)} PDF files..."):
+        with st.spinner(f"📄 Processing {len(pdf_files)} PDF files into a persistent vector database..."):
             processor = SalesforceDocumentProcessor()
+            # Chunks are streamed straight into the vector store as each PDF is parsed
             documents = processor.process_all_pdfs(pdf_directory)
-            
-            if not documents:
-                st.error("❌ No documents were processed from PDFs!")
-                st.stop()
-        
-        with st.spinner("💾 Creating persistent vector database..."):
             rag_system.create_vectorstore(documents, pdf_directory)
             info = rag_system.get_collection_info()
             st.success(f"✅ Knowledge base created with {info['count']} documents")
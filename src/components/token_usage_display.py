@@ -3,14 +3,14 @@ import plotly.express as px
 import pandas as pd
 import json
 from datetime import datetime
-from src.token_tracker import token_tracker
+from src.token_tracker import get_token_tracker, iso_timestamp
 
 def render_token_usage_sidebar():
     """Render token usage summary in sidebar"""
     with st.sidebar:
         st.header("💰 Token Usage")
         
-        stats = token_tracker.get_session_stats()
+        stats = get_token_tracker().get_session_stats()
         
         if stats['query_count'] == 0:
             st.info("No queries processed yet.")
@@ -60,7 +60,7 @@ def render_token_usage_sidebar():
         
         # Reset button
         if st.button("🔄 Reset Usage", help="Reset token usage statistics"):
-            token_tracker.reset_session_stats()
+            get_token_tracker().reset_session_stats()
             st.rerun()
 
 def render_detailed_token_dashboard():
@@ -74,7 +74,7 @@ def render_detailed_token_dashboard():
     
     st.title("💰 Token Usage & Cost Analysis")
     
-    stats = token_tracker.get_session_stats()
+    stats = get_token_tracker().get_session_stats()
     
     if stats['query_count'] == 0:
         st.info("No token usage data available yet. Start asking questions to see usage statistics!")
@@ -174,7 +174,7 @@ def render_detailed_token_dashboard():
         for i, call in enumerate(reversed(stats['detailed_calls'][-20:])):  # Last 20 calls
             calls_data.append({
                 'Call #': len(stats['detailed_calls']) - i,
-                'Time': datetime.fromisoformat(call['timestamp']).strftime('%H:%M:%S'),
+                'Time': datetime.fromtimestamp(call['timestamp']).strftime('%H:%M:%S'),
                 'Model': call['model'],
                 'Input Tokens': call['input_tokens'],
                 'Output Tokens': call['output_tokens'],
@@ -215,7 +215,7 @@ def render_detailed_token_dashboard():
                     'Cumulative Cost': cumulative_cost,
                     'Tokens': call['total_tokens'],
                     'Cumulative Tokens': cumulative_tokens,
-                    'Timestamp': call['timestamp']
+                    'Timestamp': iso_timestamp(call['timestamp'])
                 })
             
             trend_df = pd.DataFrame(trend_data)
@@ -279,10 +279,14 @@ def render_detailed_token_dashboard():
     st.subheader("📤 Export Usage Data")
     
     # Prepare usage report data
+    # Call timestamps are stored as epoch seconds; the report keeps them readable
+    detailed_calls = [
+        {**call, 'timestamp': iso_timestamp(call['timestamp'])} for call in stats['detailed_calls']
+    ]
     usage_report = {
-        'session_summary': stats,
+        'session_summary': {**stats, 'detailed_calls': detailed_calls},
         'export_timestamp': datetime.now().isoformat(),
-        'detailed_calls': stats['detailed_calls']
+        'detailed_calls': detailed_calls
     }
     
     # Create JSON data
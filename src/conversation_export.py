@@ -55,7 +55,7 @@ def export_to_markdown() -> str:
     summary = conversation_history.get_conversation_summary()
     
     # Create markdown content
-    content = f"""# Salesforce RAG Conversation Export
+    parts = [f"""# Salesforce RAG Conversation Export
 
 **Export Date:** {datetime.now().strftime('%B %d, %Y at %H:%M')}
 **Total Messages:** {summary['total_messages']}
@@ -63,7 +63,7 @@ def export_to_markdown() -> str:
 
 ---
 
-"""
+"""]
     
     current_pair = 1
     user_msg = None
@@ -73,23 +73,23 @@ def export_to_markdown() -> str:
             user_msg = msg
         elif msg["role"] == "assistant" and user_msg:
             # Write Q&A pair
-            content += f"## Q{current_pair}: {user_msg['content']}\n\n"
-            content += f"**Asked:** {user_msg['timestamp']}\n\n"
+            parts.append(f"## Q{current_pair}: {user_msg['content']}\n\n")
+            parts.append(f"**Asked:** {user_msg['timestamp']}\n\n")
             
-            content += f"**Answer:**\n{msg['content']}\n\n"
+            parts.append(f"**Answer:**\n{msg['content']}\n\n")
             
             # Add metadata if available
             if msg["metadata"].get("tool_used"):
-                content += f"**Tool Used:** {msg['metadata']['tool_used']}\n\n"
+                parts.append(f"**Tool Used:** {msg['metadata']['tool_used']}\n\n")
             
             if msg["metadata"].get("sources_count"):
-                content += f"**Sources:** {msg['metadata']['sources_count']} documents\n\n"
+                parts.append(f"**Sources:** {msg['metadata']['sources_count']} documents\n\n")
             
-            content += "---\n\n"
+            parts.append("---\n\n")
             current_pair += 1
             user_msg = None
     
-    return content
+    return "".join(parts)
 
 def export_to_pdf() -> bytes:
     """Export conversation to PDF format"""
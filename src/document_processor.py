@@ -3,7 +3,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 import os
 import hashlib
-from typing import List, Dict, Any
+from typing import Dict, Any, Iterator
 
 class SalesforceDocumentProcessor:
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
@@ -84,15 +84,16 @@ class SalesforceDocumentProcessor:
         
         return filtered
     
-    def load_pdf(self, pdf_path: str) -> List[Document]:
-        """Load and split a single PDF with ChromaDB-compatible metadata"""
+    def load_pdf(self, pdf_path: str) -> Iterator[Document]:
+        """Load and split a single PDF, yielding ChromaDB-compatible chunks as they are produced"""
         print(f"Loading PDF: {pdf_path}")
         
         # Check if file exists and is valid
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
-        if os.path.getsize(pdf_path) == 0:
+        stat = os.stat(pdf_path)
+        if stat.st_size == 0:
             raise ValueError(f"PDF file is empty: {pdf_path}")
         
         try:
@@ -108,8 +109,8 @@ class SalesforceDocumentProcessor:
             "topics": "general"
         })
         
-        # Process each document
-        processed_docs = []
+        # Split page by page so chunks can be handed downstream immediately
+        chunk_index = 0
         for i, doc in enumerate(documents):
             # Create clean metadata (only simple types)
             clean_metadata = {
@@ -124,44 +125,38 @@ class SalesforceDocumentProcessor:
             
             # Filter metadata to ensure compatibility
             doc.metadata = self.filter_metadata_for_chromadb(clean_metadata)
-            processed_docs.append(doc)
-        
-        # Split documents into chunks
-        chunks = self.text_splitter.split_documents(processed_docs)
-        
-        # Add chunk-specific metadata
-        final_chunks = []
-        for i, chunk in enumerate(chunks):
-            # Add chunk metadata
-            chunk_metadata = chunk.metadata.copy()
-            chunk_metadata.update({
-                "chunk_index": i,
-                "chunk_size": len(chunk.page_content)
-            })
             
-            # Filter again to be safe
-            chunk.metadata = self.filter_metadata_for_chromadb(chunk_metadata)
-            final_chunks.append(chunk)
+            for chunk in self.text_splitter.split_documents([doc]):
+                # Add chunk metadata
+                chunk_metadata = chunk.metadata.copy()
+                chunk_metadata.update({
+                    "chunk_index": chunk_index,
+                    "chunk_size": len(chunk.page_content)
+                })
+                chunk_index += 1
+                
+                # Filter again to be safe
+                chunk.metadata = self.filter_metadata_for_chromadb(chunk_metadata)
+                yield chunk
         
-        print(f"Created {len(final_chunks)} chunks from {filename}")
-        return final_chunks
+        print(f"Created {chunk_index} chunks from {filename}")
     
-    def process_all_pdfs(self, pdf_directory: str) -> List[Document]:
-        """Process all PDFs in directory"""
-        all_chunks = []
+    def process_all_pdfs(self, pdf_directory: str) -> Iterator[Document]:
+        """Stream chunks from all PDFs in directory"""
+        total_chunks = 0
         
         for filename in sorted(os.listdir(pdf_directory)):
             if filename.endswith('.pdf'):
                 pdf_path = os.path.join(pdf_directory, filename)
                 try:
-                    chunks = self.load_pdf(pdf_path)
-                    all_chunks.extend(chunks)
+                    for chunk in self.load_pdf(pdf_path):
+                        total_chunks += 1
+                        yield chunk
                 except Exception as e:
                     print(f"❌ Error processing {filename}: {e}")
                     continue
         
-        print(f"Total chunks created: {len(all_chunks)}")
-        return all_chunks
+        print(f"Total chunks created: {total_chunks}")
     
     def _generate_chunk_id(self, filename: str, page_num: int) -> str:
         """Generate unique chunk ID"""
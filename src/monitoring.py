@@ -2,6 +2,7 @@
 import os
 import time
 import logging
+from array import array
 from datetime import datetime
 from typing import Dict, Any, Optional
 from langsmith import Client, traceable
@@ -20,7 +21,7 @@ class SalesforceMonitor:
         self.query_count = 0
         self.error_count = 0
         self.function_call_count = 0
-        self.response_times = []
+        self.response_times = array('d')  # contiguous doubles, no boxed floats
     
     def setup_langsmith(self):
         """Setup LangSmith tracing with latest SDK"""
@@ -2,25 +2,283 @@
 from langchain_chroma import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
 import chromadb
+import numpy as np
 import os
 from dotenv import load_dotenv
-import json
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+    
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+    
+    json_loads = json.loads  # accepts bytes as well as str
 import hashlib
+import logging
+import mmap
 import time
+import asyncio
+import atexit
 import html
-from typing import List, Dict, Any
+import re
+import shutil
+import struct
+import threading
+from functools import cached_property
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from src.monitoring import monitor, track_query
 from src.rate_limiter import rate_limit
 from src.input_validator import validator
-from src.salesforce_tools import governor_limits_calculator, soql_query_optimizer, apex_code_reviewer
-from src.token_tracker import token_tracker
+# Tools are looked up per query, so the LangChain tool objects are built on first use
+from src import salesforce_tools
+from src.token_tracker import get_token_tracker
 
 load_dotenv()
 
+# Handlers are configured once by the monitor's setup_logging()
+logger = logging.getLogger(__name__)
+
+# Number of chunks embedded and written to Chroma per ingestion or upload call
+INGEST_BATCH_SIZE = 100
+# Embedding requests kept in flight while earlier batches are written to Chroma
+# (bounds concurrency against the Gemini embedding quota)
+EMBED_WORKERS = 8
+# PDFs at least this large are memory-mapped instead of read in chunks when content-hashed
+MMAP_HASH_THRESHOLD = 10 * 1024 * 1024
+# Quiet period before a burst of watcher events for the same file is processed
+FILE_EVENT_DEBOUNCE_SECONDS = 0.5
+# Attach related documentation to tool answers, only when the question has at least
+# ENRICH_MIN_WORDS words of prose besides the pasted JSON/code/query, and at most TOOL_DOCS_K docs
+ENRICH_WITH_DOCS = True
+ENRICH_MIN_WORDS = 4
+TOOL_DOCS_K = 2
+# Rough characters per token for English text (same heuristic as the token tracker's estimate)
+CHARS_PER_TOKEN = 4
+# Token budgets for retrieved context passed to the LLM (input tokens are billed per query)
+SOURCE_TOKEN_BUDGET = 200
+MAX_CONTEXT_TOKENS = 375
+# Semantic cache keys are unit vectors stored as int8 in [-127, 127]
+EMBEDDING_QUANT_SCALE = 127
+
+# Tool-routing keywords compiled into one automaton. Each alternative sits
+# inside a lookahead so overlapping keywords are all reported, matching
+# the semantics of the individual `in` checks it replaces.
+_ROUTING_RE = re.compile(
+    r"(?=(?P<governor>(?i:governor|limits|calculate|usage))"
+    r"|(?P<strong_code>public class|public static|private class|private static)"
+    r"|(?P<code_word>public|private|void|return|if\(|for\(|while\()"
+    r"|(?P<trigger>(?i:trigger ))"
+    r"|(?P<select>(?i:select))"
+    r"|(?P<from>(?i:from))"
+    r"|(?P<open_brace>\{)"
+    r"|(?P<close_brace>\}))"
+)
+
+# Alphabetic words, used to measure how much prose surrounds a tool payload
+_WORD_RE = re.compile(r"[A-Za-z]+")
+
+# Anything html.unescape() would decode (same shape as its internal charref pattern)
+_ENTITY_RE = re.compile(r"&(?:#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)")
+
+# Static instructions go in the system message; only context and question vary per call
+RAG_SYSTEM_PROMPT = """You are a Salesforce Architecture & Best Practices Advisor. Use the context from official Salesforce documentation provided with each question to give expert guidance.
+
+Instructions:
+- Provide detailed, actionable advice based on the Salesforce documentation
+- Include specific examples and code snippets when relevant
+- Reference best practices and governor limits when applicable
+- Mention security considerations when relevant
+- Cite which Salesforce guide the information comes from
+- If the question involves architecture decisions, provide pros/cons of different approaches"""
+
+RAG_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", RAG_SYSTEM_PROMPT),
+    ("human", "Context from Salesforce Documentation:{context}\n\nQuestion: {question}\n\nProvide a comprehensive answer:")
+])
+
+# Open Chroma handles shared by every RAG system instance, keyed by absolute
+# persist directory, so reruns don't reopen SQLite and reload the HNSW index
+_VECTORSTORE_CACHE: Dict[str, Chroma] = {}
+_VECTORSTORE_CACHE_LOCK = threading.Lock()
+
+# SELECT ... FROM ... statement, ending at a question mark, a blank line or end of text
+_SOQL_EXTRACT_RE = re.compile(
+    r"select\b(?:(?!\?|\n\s*\n).)*?\bfrom\b(?:(?!\?|\n\s*\n).)*",
+    re.IGNORECASE | re.DOTALL
+)
+# Trailing prompt words that sometimes follow a pasted query
+_SOQL_TRAILER_RE = re.compile(r"\s+(?:optimize|query)$", re.IGNORECASE)
+# First token that starts a block of Apex code
+_CODE_START_RE = re.compile(r"public|private|trigger")
+
+# Answers kept per semantic cache (FIFO-evicted)
+SEMANTIC_CACHE_SIZE = 256
+
+class _SemanticCache:
+    """Approximate answer cache for one persist directory, keyed on int8-quantized query embeddings
+    
+    One instance is shared by every RAG system over the same directory, so all sessions
+    see the same answers and a knowledge-base change clears them for everyone. The file
+    watcher clears it from its timer thread while queries use it on session threads,
+    so every access goes through ``lock``.
+    """
+    
+    def __init__(self, persist_directory: str):
+        self.persist_directory = persist_directory
+        self.keys: List[np.ndarray] = []
+        self.values: List[Dict[str, Any]] = []
+        self.matrix: Optional[np.ndarray] = None  # stacked keys, rebuilt lazily
+        self.lock = threading.Lock()
+    
+    def lookup(self, query_q8: np.ndarray, min_score: float) -> Optional[Dict[str, Any]]:
+        """Copy of the closest cached answer if its score reaches min_score (query as int32)"""
+        with self.lock:
+            if not self.keys:
+                return None
+            
+            if self.matrix is None:
+                self.matrix = np.stack(self.keys)
+            
+            similarities = self.matrix.astype(np.int32) @ query_q8
+            best = int(np.argmax(similarities))
+            if similarities[best] >= min_score:
+                return dict(self.values[best])
+            return None
+    
+    def store(self, key: np.ndarray, result: Dict[str, Any]):
+        """Remember an answer, evicting the oldest one when full"""
+        with self.lock:
+            if len(self.keys) >= SEMANTIC_CACHE_SIZE:
+                self.keys.pop(0)
+                self.values.pop(0)
+            
+            self.keys.append(key)
+            self.values.append(result)
+            self.matrix = None
+    
+    def clear(self):
+        """Forget every cached answer"""
+        with self.lock:
+            self.keys = []
+            self.values = []
+            self.matrix = None
+    
+    def _paths(self):
+        """Embedding matrix, answer sidecar and manifest fingerprint files"""
+        return (os.path.join(self.persist_directory, "qcache.npy"),
+                os.path.join(self.persist_directory, "qcache.jsonl"),
+                os.path.join(self.persist_directory, "qcache.manifest"))
+    
+    def _manifest_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the PDF manifest the vector store was last built from, if recorded"""
+        try:
+            with open(os.path.join(self.persist_directory, "metadata.json"), 'rb') as f:
+                manifest = json_loads(f.read()).get('pdf_manifest')
+        except Exception:
+            return None
+        return SalesforceRAGSystem._fingerprint_manifest(manifest) if manifest is not None else None
+    
+    def load(self):
+        """Restore the cache written by a previous process, unless the knowledge base changed since"""
+        matrix_path, answers_path, manifest_path = self._paths()
+        if not (os.path.exists(matrix_path) and os.path.exists(answers_path) and os.path.exists(manifest_path)):
+            return
+        
+        try:
+            with open(manifest_path, 'r') as f:
+                saved_fingerprint = f.read().strip()
+            if saved_fingerprint != self._manifest_fingerprint():
+                logger.info("Knowledge base changed since the semantic cache was saved, discarding it")
+                return
+            
+            matrix = np.load(matrix_path)
+            values = []
+            with open(answers_path, 'rb') as f:
+                for line in f:
+                    entry = json_loads(line)
+                    entry['sources'] = [Document(page_content=d['page_content'], metadata=d['metadata'])
+                                        for d in entry['sources']]
+                    values.append(entry)
+        except Exception as e:
+            logger.warning("Could not load semantic cache: %s", e)
+            return
+        
+        if matrix.ndim != 2 or len(matrix) != len(values):
+            logger.warning("Semantic cache files are inconsistent, ignoring them")
+            return
+        
+        if matrix.dtype != np.int8:
+            matrix = SalesforceRAGSystem._quantize_embedding(matrix)
+        
+        with self.lock:
+            self.keys = list(matrix[-SEMANTIC_CACHE_SIZE:])
+            self.values = values[-SEMANTIC_CACHE_SIZE:]
+            self.matrix = None
+        logger.info("Loaded %s semantic cache entries", len(values[-SEMANTIC_CACHE_SIZE:]))
+    
+    def save(self):
+        """Write the cache to disk along with the manifest fingerprint it was built against"""
+        paths = self._paths()
+        matrix_path, answers_path, manifest_path = paths
+        with self.lock:
+            keys = list(self.keys)
+            values = list(self.values)
+        try:
+            fingerprint = self._manifest_fingerprint()
+            if not keys or fingerprint is None:
+                for path in paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+                return
+            
+            os.makedirs(self.persist_directory, exist_ok=True)
+            np.save(matrix_path, np.stack(keys))
+            with open(answers_path, 'wb') as f:
+                for value in values:
+                    entry = dict(value)
+                    entry['sources'] = [{"page_content": doc.page_content, "metadata": doc.metadata}
+                                        for doc in value['sources']]
+                    f.write(json_dumps(entry))
+                    f.write(b"\n")
+            with open(manifest_path, 'w') as f:
+                f.write(fingerprint)
+        except Exception as e:
+            logger.warning("Could not save semantic cache: %s", e)
+
+# Semantic caches keyed by absolute persist directory, loaded on first use
+_SEMANTIC_CACHES: Dict[str, _SemanticCache] = {}
+_SEMANTIC_CACHES_LOCK = threading.Lock()
+
+def _get_semantic_cache(persist_directory: str) -> _SemanticCache:
+    """Shared semantic cache for a persist directory, restored from disk on first use"""
+    key = os.path.abspath(persist_directory)
+    with _SEMANTIC_CACHES_LOCK:
+        cache = _SEMANTIC_CACHES.get(key)
+        if cache is None:
+            cache = _SEMANTIC_CACHES[key] = _SemanticCache(persist_directory)
+            cache.load()
+        return cache
+
+@atexit.register
+def _save_semantic_caches():
+    """Persist every semantic cache once at interpreter exit"""
+    with _SEMANTIC_CACHES_LOCK:
+        caches = list(_SEMANTIC_CACHES.values())
+    for cache in caches:
+        cache.save()
+
 class SalesforceRAGSystem:
-    def __init__(self, persist_directory: str = "data/vectorstore_persistent"):
+    def __init__(self, persist_directory: str = "data/vectorstore_persistent", content_fingerprint: bool = False):
         self.persist_directory = persist_directory
+        # Also hash PDF contents so edits that preserve size and mtime are detected (slower)
+        self.content_fingerprint = content_fingerprint
         
         google_api_key = os.getenv("GOOGLE_API_KEY")
         if not google_api_key:
@@ -35,46 +293,112 @@ class SalesforceRAGSystem:
         self.qa_chain = None
         self.collection_name = "salesforce_docs"
         self.metadata_file = os.path.join(persist_directory, "metadata.json")
+        # Parsed metadata.json, reused while the file's mtime is unchanged
+        self._metadata_cache: Optional[Dict] = None
+        self._metadata_mtime = 0
+        # pdf_directory -> (directory st_mtime_ns, manifest); the directory mtime moves on
+        # create/delete/rename, in-place rewrites are covered by _update_metadata_after_change
+        self._manifest_cache: Dict[str, tuple] = {}
+        
+        # Filenames currently being handled by handle_file_change
+        self._in_flight: set = set()
+        self._in_flight_lock = threading.Lock()
+        
+        # Debounced watcher events: file path -> effective event type (last wins)
+        self._pending_events: Dict[str, str] = {}
+        self._pending_lock = threading.Lock()
+        self._pending_timer: Optional[threading.Timer] = None
+        
+        # Approximate answer cache for regular RAG questions, shared by every
+        # instance over this persist directory and persisted next to the vector store
+        self.semantic_cache_threshold = 0.95  # minimum cosine similarity for a hit
+        self._semantic_cache = _get_semantic_cache(persist_directory)
+        
+        # Exact-match LRU cache keyed on a digest of the normalized question
+        self.answer_cache_size = 512
+        self._answer_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._answer_cache_lock = threading.Lock()
     
-    def _get_pdf_fingerprint(self, pdf_directory: str) -> str:
-        """Create a fingerprint of all PDFs to detect changes"""
-        pdf_info = {}
+    def _get_pdf_manifest(self, pdf_directory: str) -> Dict[str, str]:
+        """Map each PDF filename to a version string derived from its size and mtime (plus content hash if enabled)"""
+        try:
+            dir_mtime = os.stat(pdf_directory).st_mtime_ns
+        except OSError:
+            return {}
         
-        if not os.path.exists(pdf_directory):
-            return ""
+        cached = self._manifest_cache.get(pdf_directory)
+        if cached is not None and cached[0] == dir_mtime:
+            return dict(cached[1])
         
-        for filename in sorted(os.listdir(pdf_directory)):
-            if filename.endswith('.pdf'):
-                filepath = os.path.join(pdf_directory, filename)
+        # scandir avoids the listdir + path join round trip; DirEntry caches its stat result
+        manifest = {}
+        with os.scandir(pdf_directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
                 try:
-                    stat = os.stat(filepath)
-                    pdf_info[filename] = {
-                        'size': stat.st_size,
-                        'modified': stat.st_mtime
-                    }
+                    # is_file() is answered from the dirent type on Linux, no stat needed
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    version = f"{stat.st_size}-{stat.st_mtime_ns}"
+                    if self.content_fingerprint:
+                        version = f"{version}-{self._get_pdf_content_digest(entry.path, stat.st_size)}"
                 except OSError:
                     continue
+                manifest[entry.name] = version
         
-        info_str = json.dumps(pdf_info, sort_keys=True)
-        return hashlib.md5(info_str.encode()).hexdigest()
+        self._manifest_cache[pdf_directory] = (dir_mtime, manifest)
+        return dict(manifest)
+    
+    @staticmethod
+    def _get_pdf_content_digest(pdf_path: str, size: int) -> str:
+        """Hash a PDF's bytes, memory-mapping large files to avoid copying them through read buffers"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(pdf_path, 'rb') as f:
+            if size >= MMAP_HASH_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    digest.update(mm)
+            else:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _fingerprint_manifest(manifest: Dict[str, str]) -> str:
+        """Short digest of a PDF manifest, for display only"""
+        # Length-prefixed fields fed straight into the hash; no joined string is built
+        digest = hashlib.blake2b(digest_size=8)
+        for name, version in sorted(manifest.items()):
+            name_bytes, version_bytes = name.encode(), version.encode()
+            digest.update(struct.pack('<QQ', len(name_bytes), len(version_bytes)))
+            digest.update(name_bytes)
+            digest.update(version_bytes)
+        return digest.hexdigest()
     
-    def _save_metadata(self, pdf_fingerprint: str, document_count: int):
+    def _save_metadata(self, document_count: int, pdf_manifest: Dict[str, str]):
         """Save metadata about the vector store"""
         os.makedirs(self.persist_directory, exist_ok=True)
         metadata = {
-            'pdf_fingerprint': pdf_fingerprint,
+            'pdf_manifest': pdf_manifest,
             'document_count': document_count,
             'created_at': time.time()
         }
-        with open(self.metadata_file, 'w') as f:
-            json.dump(metadata, f)
+        with open(self.metadata_file, 'wb') as f:
+            f.write(json_dumps(metadata))
+        self._metadata_cache = None
     
     def _load_metadata(self) -> Dict:
         """Load metadata about the vector store"""
         try:
-            if os.path.exists(self.metadata_file):
-                with open(self.metadata_file, 'r') as f:
-                    return json.load(f)
+            mtime = os.stat(self.metadata_file).st_mtime_ns
+            if self._metadata_cache is not None and mtime == self._metadata_mtime:
+                return self._metadata_cache
+            
+            with open(self.metadata_file, 'rb') as f:
+                metadata = json_loads(f.read())
+            self._metadata_cache, self._metadata_mtime = metadata, mtime
+            return metadata
         except Exception:
             pass
         return {}
@@ -82,7 +406,7 @@ class SalesforceRAGSystem:
     def needs_rebuild(self, pdf_directory: str) -> bool:
         """Check if vector store needs to be rebuilt"""
         if not os.path.exists(self.persist_directory):
-            print("📁 No vector store directory found")
+            logger.info("No vector store directory found")
             return True
         
         try:
@@ -91,32 +415,84 @@ class SalesforceRAGSystem:
             collection_names = [c.name for c in collections]
             
             if self.collection_name not in collection_names:
-                print("📊 Collection not found")
+                logger.info("Collection not found")
                 return True
             
             collection = client.get_collection(self.collection_name)
             if collection.count() == 0:
-                print("📋 Collection is empty")
+                logger.info("Collection is empty")
                 return True
             
         except Exception as e:
-            print(f"❌ Error checking collection: {e}")
+            logger.error("Error checking collection: %s", e)
             return True
         
-        current_fingerprint = self._get_pdf_fingerprint(pdf_directory)
-        stored_metadata = self._load_metadata()
-        stored_fingerprint = stored_metadata.get('pdf_fingerprint', '')
-        
-        if current_fingerprint != stored_fingerprint:
-            print("📄 PDFs have changed since last build")
+        if 'pdf_manifest' not in self._load_metadata():
+            # Stores built before per-file manifests were tracked cannot be updated incrementally
+            logger.info("No PDF manifest stored for this build")
             return True
         
-        print("✅ Vector store is up to date")
+        logger.info("Vector store can be loaded")
         return False
     
-    def create_vectorstore(self, documents: List[Document], pdf_directory: str):
-        """Create ChromaDB vector store with persistence"""
-        print(f"Creating persistent ChromaDB vector store with {len(documents)} chunks...")
+    def needs_incremental_update(self, pdf_directory: str) -> set:
+        """Return the PDF filenames that were added, modified or deleted since the last build"""
+        stored_manifest = self._load_metadata().get('pdf_manifest', {})
+        current_manifest = self._get_pdf_manifest(pdf_directory)
+        if current_manifest == stored_manifest:
+            return set()
+        
+        changed = {name for name, version in current_manifest.items() if stored_manifest.get(name) != version}
+        changed.update(name for name in stored_manifest if name not in current_manifest)
+        return changed
+    
+    def incremental_update(self, pdf_directory: str) -> int:
+        """Re-index only the PDFs that changed instead of rebuilding the whole store"""
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
+        
+        changed = self.needs_incremental_update(pdf_directory)
+        if not changed:
+            logger.info("Vector store is up to date")
+            return 0
+        
+        logger.info("Incrementally updating %s changed PDF(s)...", len(changed))
+        manifest = self._get_pdf_manifest(pdf_directory)
+        
+        for filename in sorted(changed):
+            pdf_path = os.path.join(pdf_directory, filename)
+            self.remove_documents_by_source(pdf_path, update_metadata=False)
+            if filename not in manifest:
+                continue
+            try:
+                documents = self.process_single_pdf(pdf_path)
+                self.add_documents_to_vectorstore(documents, pdf_path, update_metadata=False)
+            except Exception as e:
+                # Leave it out of the manifest so the next startup retries it
+                logger.error("Failed to re-index %s: %s", filename, e)
+                del manifest[filename]
+        
+        current_count = self._doc_count()
+        self._save_metadata(current_count, manifest)
+        return len(changed)
+    
+    @staticmethod
+    def _iter_batches(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+        """Group a (possibly lazy) document stream into fixed-size lists"""
+        iterator = iter(documents)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def create_vectorstore(self, documents: Iterable[Document], pdf_directory: str):
+        """Create ChromaDB vector store with persistence
+        
+        ``documents`` may be a generator (e.g. ``process_all_pdfs``); chunks are
+        embedded in batches as they arrive so parsing overlaps with ingestion.
+        """
+        logger.info("Creating persistent ChromaDB vector store...")
         
         # Stop any existing file watcher to release locks (only for initial creation)
         try:
@@ -125,68 +501,100 @@ class SalesforceRAGSystem:
         except:
             pass  # May not exist yet
         
+        with _VECTORSTORE_CACHE_LOCK:
+            _VECTORSTORE_CACHE.pop(os.path.abspath(self.persist_directory), None)
+        
         if os.path.exists(self.persist_directory):
-            import shutil
+            # Move the old store aside in one rename and delete it in the background,
+            # instead of retrying rmtree with sleeps while Chroma may still hold files
+            trash_directory = f"{self.persist_directory}.trash.{time.time_ns()}"
             try:
-                # Wait longer and try multiple times
-                for attempt in range(3):
-                    try:
-                        shutil.rmtree(self.persist_directory)
-                        time.sleep(2)
-                        print("🗑️ Removed existing vector store")
-                        break
-                    except Exception as e:
-                        if attempt < 2:
-                            print(f"⚠️ Attempt {attempt + 1} failed, retrying...")
-                            time.sleep(3)
-                        else:
-                            print(f"⚠️ Could not remove existing vector store: {e}")
-                            timestamp = int(time.time())
-                            self.persist_directory = f"{self.persist_directory}_{timestamp}"
-                            self.metadata_file = os.path.join(self.persist_directory, "metadata.json")
-            except Exception as e:
-                print(f"⚠️ Could not remove existing vector store: {e}")
+                os.replace(self.persist_directory, trash_directory)
+                threading.Thread(target=shutil.rmtree, args=(trash_directory,),
+                                 kwargs={"ignore_errors": True}, daemon=True).start()
+                logger.info("Removed existing vector store")
+            except OSError as e:
+                # Platforms that refuse to rename an in-use directory get a fresh one instead
+                logger.warning("Could not remove existing vector store: %s", e)
                 timestamp = int(time.time())
                 self.persist_directory = f"{self.persist_directory}_{timestamp}"
                 self.metadata_file = os.path.join(self.persist_directory, "metadata.json")
+                self._semantic_cache = _get_semantic_cache(self.persist_directory)
         
         try:
-            self.vectorstore = Chroma.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
+            self.vectorstore = Chroma(
+                embedding_function=self.embeddings,
                 persist_directory=self.persist_directory,
                 collection_name=self.collection_name,
                 collection_metadata={"description": "Salesforce Architecture & Best Practices Knowledge Base"}
             )
+            with _VECTORSTORE_CACHE_LOCK:
+                _VECTORSTORE_CACHE[os.path.abspath(self.persist_directory)] = self.vectorstore
             
-            print(f"✅ Vector store created and persisted to {self.persist_directory}")
+            self.clear_query_cache()
+            document_count = 0
             
-            pdf_fingerprint = self._get_pdf_fingerprint(pdf_directory)
-            self._save_metadata(pdf_fingerprint, len(documents))
+            # Embed batches on worker threads while finished ones are inserted
+            with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as executor:
+                pending = deque()
+                for batch in self._iter_batches(documents, INGEST_BATCH_SIZE):
+                    texts = [doc.page_content for doc in batch]
+                    pending.append((batch, texts, executor.submit(self.embeddings.embed_documents, texts)))
+                    if len(pending) >= EMBED_WORKERS:
+                        document_count += self._add_embedded_batch(*pending.popleft())
+                        logger.info("Ingested %s chunks...", document_count)
+                
+                while pending:
+                    document_count += self._add_embedded_batch(*pending.popleft())
+                    logger.info("Ingested %s chunks...", document_count)
+            
+            if document_count == 0:
+                raise ValueError("No documents were processed from PDFs")
+            
+            logger.info("Vector store created and persisted to %s", self.persist_directory)
             
-            count = len(self.vectorstore.get()['ids'])
-            print(f"Successfully created vector store with {count} documents")
+            pdf_manifest = self._get_pdf_manifest(pdf_directory)
+            self._save_metadata(document_count, pdf_manifest)
+            
+            count = self._doc_count()
+            logger.info("Successfully created vector store with %s documents", count)
             
         except Exception as e:
-            print(f"❌ Error creating vectorstore: {e}")
+            logger.error("Error creating vectorstore: %s", e)
             raise
     
+    def _add_embedded_batch(self, batch: List[Document], texts: List[str], embedding_future: Future) -> int:
+        """Write a batch with pre-computed embeddings straight into the Chroma collection"""
+        self.vectorstore._collection.add(
+            ids=[str(uuid.uuid4()) for _ in batch],
+            embeddings=embedding_future.result(),
+            documents=texts,
+            metadatas=[doc.metadata for doc in batch]
+        )
+        return len(batch)
+    
     def load_vectorstore(self):
         """Load existing persistent vector store"""
-        print("📂 Loading existing vector store...")
+        logger.info("Loading existing vector store...")
         
         try:
-            self.vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings,
-                collection_name=self.collection_name
-            )
+            key = os.path.abspath(self.persist_directory)
+            with _VECTORSTORE_CACHE_LOCK:
+                vectorstore = _VECTORSTORE_CACHE.get(key)
+                if vectorstore is None:
+                    vectorstore = Chroma(
+                        persist_directory=self.persist_directory,
+                        embedding_function=self.embeddings,
+                        collection_name=self.collection_name
+                    )
+                    _VECTORSTORE_CACHE[key] = vectorstore
+            self.vectorstore = vectorstore
             
-            count = len(self.vectorstore.get()['ids'])
-            print(f"✅ Loaded vector store with {count} documents")
+            count = self._doc_count()
+            logger.info("Loaded vector store with %s documents", count)
             
         except Exception as e:
-            print(f"❌ Error loading vectorstore: {e}")
+            logger.error("Error loading vectorstore: %s", e)
             raise
     
     def setup_qa_chain(self):
@@ -194,25 +602,32 @@ class SalesforceRAGSystem:
         if not self.vectorstore:
             raise ValueError("Vector store not initialized")
         
-        # Create LLM (token tracking added per call)
-        self.llm = ChatGoogleGenerativeAI(
+        # The LLM is built lazily on first use
+        logger.info("Simple function calling setup complete")
+    
+    @cached_property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        """Chat model, created on the first generative call (token tracking added per call)"""
+        return ChatGoogleGenerativeAI(
             model="gemini-2.0-flash-exp",
             temperature=0.1,
             max_output_tokens=2048
         )
-        
-        # Create retriever
-        self.retriever = self.vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5}
-        )
-        
-        print("✅ Simple function calling setup complete")
 
     @track_query
     @rate_limit("query")
-    def query(self, question: str) -> Dict[str, Any]:
+    def query(self, question: str, include_related_docs: bool = True) -> Dict[str, Any]:
         """Query with manual function calling detection"""
+        return self._query(question, include_related_docs)
+    
+    async def aquery(self, question: str, include_related_docs: bool = True) -> Dict[str, Any]:
+        """Async variant of query() that keeps rate limiting and monitoring"""
+        # The Google clients are created outside any event loop, so the whole
+        # query runs on a worker thread with its own loop rather than this one
+        return await asyncio.to_thread(self.query, question, include_related_docs)
+    
+    def _query(self, question: str, include_related_docs: bool) -> Dict[str, Any]:
+        """Query body; the related-docs search runs on a worker thread while the tool runs"""
         
         is_valid, message, cleaned_question = validator.validate_question(question)
         if not is_valid:
@@ -222,128 +637,148 @@ class SalesforceRAGSystem:
         # Use cleaned question
         question = cleaned_question
         
-        if not hasattr(self, 'llm') or not self.llm:
-            self.setup_qa_chain()
-        
-        print(f"Processing query: {question}")
-        monitor.log_system_event("query_started", {"question": question[:50]})
+        if not self.vectorstore:
+            raise ValueError("Vector store not initialized")
         
         # Check if question needs function calling
         question_lower = question.lower()
         function_result = None
+        tool = None
+        tool_input = None
+        tool_payload = question  # the part of the question handed to the tool
         tool_used = None
+        hits = self._route_categories(question)
         
         # 1. GOVERNOR LIMITS CALCULATION DETECTION - require JSON data
-        if (any(keyword in question_lower for keyword in ["governor", "limits", "calculate", "usage"]) and 
-            "{" in question and "}" in question):
+        if "governor" in hits and "open_brace" in hits and "close_brace" in hits:
             
             # Extract JSON part and decode HTML entities
             json_start = question.find("{")
             json_end = question.rfind("}") + 1
             operations = question[json_start:json_end] if json_start >= 0 and json_end > json_start else question
+            tool_payload = operations
             
-            # Decode HTML entities (need to decode twice for double-encoded content)
-            operations = html.unescape(operations)
-            operations = html.unescape(operations)
+            # Decode HTML entities (up to twice for double-encoded content), only while any remain
+            for _ in range(2):
+                if not _ENTITY_RE.search(operations):
+                    break
+                operations = html.unescape(operations)
             
-            function_result = governor_limits_calculator.invoke({"operations": operations})
+            tool, tool_input = salesforce_tools.governor_limits_calculator, {"operations": operations}
             tool_used = "📊 Governor Limits Calculator"
         
         # 2. APEX CODE REVIEW DETECTION - require strong code indicators
-        elif (any(strong_code in question for strong_code in ["public class", "public static", "private class", "private static"]) or
-              ("{" in question and any(code_word in question for code_word in ["public", "private", "void", "return", "if(", "for(", "while("])) or
-              ("trigger " in question.lower() and "{" in question)):
-            # Look for actual code in the question  
-            if True:  # We already checked for strong indicators above
-                # Extract code (look for code patterns)
-                code_start = -1
-                for pattern in ["public class", "trigger", "public", "private"]:
-                    if pattern in question:
-                        code_start = question.find(pattern)
-                        break
-                
-                if code_start >= 0:
-                    code = question[code_start:]
-                else:
-                    # Look for code-like patterns
-                    if "{" in question and "}" in question:
-                        brace_start = question.find("{")
-                        code = question[:brace_start + question[brace_start:].find("}") + 1]
-                    else:
-                        code = question
-                
-                print(f"📝 Extracted code: {code[:100]}...")
-                function_result = apex_code_reviewer.invoke({"code": code})
-                tool_used = "🔧 Apex Code Reviewer"
+        elif ("strong_code" in hits or
+              ("open_brace" in hits and "code_word" in hits) or
+              ("trigger" in hits and "open_brace" in hits)):
+            # Extract code starting at the first code token
+            code_match = _CODE_START_RE.search(question)
+            if code_match:
+                code = question[code_match.start():]
+            elif "open_brace" in hits and "close_brace" in hits:
+                # Look for code-like patterns
+                brace_start = question.find("{")
+                code = question[:brace_start + question[brace_start:].find("}") + 1]
+            else:
+                code = question
+            
+            tool_payload = code
+            logger.debug("Extracted code: %s...", code[:100])
+            tool, tool_input = salesforce_tools.apex_code_reviewer, {"code": code}
+            tool_used = "🔧 Apex Code Reviewer"
         
         # 3. SOQL QUERY OPTIMIZATION DETECTION - require actual SELECT statement
-        elif "select" in question_lower and "from" in question_lower:
-            if "select" in question_lower:
-                # Find and extract SELECT statement
-                select_start = question_lower.find("select")
-                query_part = question[select_start:] if select_start >= 0 else question
-                
-                # Clean up the query - look for SQL keywords to determine end
-                lines = query_part.split('\n')
-                clean_query_parts = []
-                
-                for line in lines:
-                    line = line.strip()
-                    if line and any(sql_word in line.lower() for sql_word in ['select', 'from', 'where', 'order', 'limit', 'group', 'having']):
-                        clean_query_parts.append(line)
-                    elif clean_query_parts and not any(char in line for char in ['?', ':', 'can', 'you', 'please', 'optimize']):
-                        # Continue if it looks like part of the query
-                        clean_query_parts.append(line)
-                
-                final_query = ' '.join(clean_query_parts) if clean_query_parts else query_part.strip()
-                
-                # Remove common question words from the end
-                for word in [' ?', '?', ' optimize', ' query']:
-                    if final_query.lower().endswith(word):
-                        final_query = final_query[:-len(word)].strip()
-                
-                print(f"📝 Extracted query: {final_query}")
-                function_result = soql_query_optimizer.invoke({"query": final_query})
-                tool_used = "⚡ SOQL Query Optimizer"
+        elif "select" in hits and "from" in hits:
+            # Find and extract SELECT statement in a single scan
+            query_match = _SOQL_EXTRACT_RE.search(question)
+            if query_match:
+                tool_payload = query_match.group(0)
+                final_query = " ".join(tool_payload.split())
+            else:
+                tool_payload = question[question_lower.find("select"):]
+                final_query = tool_payload.strip()
+            
+            # Remove common question words from the end
+            final_query = _SOQL_TRAILER_RE.sub("", final_query)
+            
+            logger.debug("Extracted query: %s", final_query)
+            tool, tool_input = salesforce_tools.soql_query_optimizer, {"query": final_query}
+            tool_used = "⚡ SOQL Query Optimizer"
+        
+        # Tool output is case-sensitive (Salesforce ID checksums, the echoed query), so tool
+        # answers are keyed on the exact question and only LLM answers on the case-folded one
+        cache_key = self._answer_cache_key(question, include_related_docs, case_sensitive=tool is not None)
+        cached_result = self._answer_cache_lookup(cache_key)
+        if cached_result is not None:
+            logger.debug("Answer cache hit")
+            return cached_result
+        
+        logger.debug("Processing query: %s", question)
+        monitor.log_system_event("query_started", {"question": question[:50]})
+        
+        # 4. RUN THE TOOL, FETCHING RELATED DOCS CONCURRENTLY (skipped for tool-only answers
+        #    and for bare payloads, where the docs would only be decorative)
+        docs = []
+        if tool is not None:
+            if include_related_docs and self._wants_related_docs(question, tool_payload):
+                # Plain threads rather than an event loop, so query() also works
+                # when called from a thread that already runs one
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    docs_future = executor.submit(self._retrieve, question, None, TOOL_DOCS_K)
+                    function_result = tool.invoke(tool_input)
+                    docs = docs_future.result()
+            else:
+                function_result = tool.invoke(tool_input)
         
-        # 4. RETURN FUNCTION CALLING RESULT
         if function_result and tool_used:
-            print(f"✅ Function calling successful with {tool_used}")
-            
-            # Get some context from documents for additional info
-            docs = self.retriever.invoke(question)
+            logger.debug("Function calling successful with %s", tool_used)
             
             # Combine function result with relevant documentation
-            enhanced_answer = f"## {tool_used} Results:\n\n{function_result}"
+            parts = [f"## {tool_used} Results:\n\n{function_result}"]
             
             if docs:
-                enhanced_answer += f"\n\n---\n\n## 📚 Related Salesforce Documentation:\n\n"
-                for i, doc in enumerate(docs[:2]):  # Show top 2 relevant docs
-                    doc_context = doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content
-                    enhanced_answer += f"**{i+1}. From {doc.metadata.get('source_file', 'Salesforce Docs')}:**\n{doc_context}\n\n"
+                parts.append("\n\n---\n\n## 📚 Related Salesforce Documentation:\n\n")
+                parts.extend(  # Show top relevant docs
+                    f"**{i+1}. From {doc.metadata.get('source_file', 'Salesforce Docs')}:**\n{self._truncate(doc.page_content, 300)}\n\n"
+                    for i, doc in enumerate(docs[:TOOL_DOCS_K])
+                )
+            enhanced_answer = "".join(parts)
             
             # Manual token tracking for function calling (no LLM tokens used)
-            token_tracker._update_session_stats({
+            get_token_tracker()._update_session_stats({
                 'input_tokens': 0,  # Function calling uses no LLM tokens
                 'output_tokens': 0,
                 'total_tokens': 0,
                 'model': 'function-call',
                 'response_time': 0.1,  # Minimal processing time
-                'timestamp': __import__('datetime').datetime.now().isoformat(),
+                'timestamp': time.time(),
                 'cost': 0.0,  # No cost for function calling
                 'estimated': False
             })
             
-            return {
+            result = {
                 "answer": enhanced_answer,
                 "sources": docs[:3] if docs else [],
                 "source_metadata": [doc.metadata for doc in docs[:3]] if docs else [],
                 "tool_used": tool_used
             }
+            self._answer_cache_store(cache_key, result)
+            return result
         
         # 5. REGULAR RAG FOR NON-FUNCTION QUESTIONS
-        print("📚 Using regular RAG (no function calling detected)")
-        docs = self.retriever.invoke(question)
+        logger.debug("Using regular RAG (no function calling detected)")
+        
+        # Embed once: the vector serves both the semantic cache and the search
+        query_embedding = self.embeddings.embed_query(question)
+        query_vector = self._normalize_embedding(query_embedding)
+        
+        cached_result = self._semantic_cache_lookup(query_vector)
+        if cached_result is not None:
+            logger.debug("Semantic cache hit - reusing previous answer")
+            self._answer_cache_store(cache_key, cached_result)
+            return cached_result
+        
+        docs = self._retrieve(question, q_emb=query_embedding)
         
         if not docs:
             return {
@@ -352,43 +787,132 @@ class SalesforceRAGSystem:
                 "source_metadata": []
             }
         
-        # Create context from documents
-        context = ""
-        for i, doc in enumerate(docs[:3]):
-            source_file = doc.metadata.get('source_file', 'Unknown')
-            content = doc.page_content[:800] + "..." if len(doc.page_content) > 800 else doc.page_content
-            context += f"\n\n--- Source {i+1}: {source_file} ---\n{content}"
+        # Create context from documents, trimmed to the token budgets
+        context = "".join(
+            f"\n\n--- Source {i+1}: {doc.metadata.get('source_file', 'Unknown')} ---\n{self._truncate_to_tokens(doc.page_content, SOURCE_TOKEN_BUDGET)}"
+            for i, doc in enumerate(docs[:3])
+        )[:MAX_CONTEXT_TOKENS * CHARS_PER_TOKEN]
         
         # Create prompt for regular RAG
-        prompt_text = f"""You are a Salesforce Architecture & Best Practices Advisor. Use the following context from official Salesforce documentation to provide expert guidance.
-
-Context from Salesforce Documentation:{context}
-
-Question: {question}
-
-Instructions:
-- Provide detailed, actionable advice based on the Salesforce documentation
-- Include specific examples and code snippets when relevant
-- Reference best practices and governor limits when applicable
-- Mention security considerations when relevant
-- Cite which Salesforce guide the information comes from
-- If the question involves architecture decisions, provide pros/cons of different approaches
-
-Provide a comprehensive answer:"""
+        messages = RAG_PROMPT.format_messages(context=context, question=question)
         
         # Get response from LLM with token tracking
         try:
-            response = self.llm.invoke(prompt_text, config={"callbacks": [token_tracker]})
+            # Stays on the calling thread: the token tracker callback writes Streamlit session state
+            response = self.llm.invoke(messages, config={"callbacks": [get_token_tracker()]})
             answer = response.content if hasattr(response, 'content') else str(response)
         except Exception as e:
-            print(f"❌ Error getting LLM response: {e}")
-            answer = "I encountered an error processing your question. Please try again or rephrase your question."
+            logger.error("Error getting LLM response: %s", e)
+            return {
+                "answer": "I encountered an error processing your question. Please try again or rephrase your question.",
+                "sources": docs,
+                "source_metadata": [doc.metadata for doc in docs]
+            }
         
-        return {
+        result = {
             "answer": answer,
             "sources": docs,
             "source_metadata": [doc.metadata for doc in docs]
         }
+        self._semantic_cache_store(query_vector, result)
+        self._answer_cache_store(cache_key, result)
+        return result
+    
+    def _retrieve(self, question: str, q_emb: Optional[List[float]] = None, k: int = 5) -> List[Document]:
+        """Similarity search that reuses an already computed query embedding when given"""
+        if q_emb is None:
+            q_emb = self.embeddings.embed_query(question)
+        return self._retrieve_raw(q_emb, k=k)
+    
+    def _retrieve_raw(self, q_emb: List[float], k: int = 5) -> List[Document]:
+        """Query the Chroma collection directly, skipping the LangChain vector store layers"""
+        result = self.vectorstore._collection.query(
+            query_embeddings=[list(q_emb)],
+            n_results=k,
+            include=["documents", "metadatas"]
+        )
+        return [Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(result['documents'][0], result['metadatas'][0])]
+    
+    @staticmethod
+    def _wants_related_docs(question: str, tool_payload: str) -> bool:
+        """Whether a tool answer should be enriched with retrieved documentation"""
+        if not ENRICH_WITH_DOCS:
+            return False
+        prose = question.replace(tool_payload, " ", 1)
+        return len(_WORD_RE.findall(prose)) >= ENRICH_MIN_WORDS
+    
+    @staticmethod
+    def _truncate(text: str, limit: int) -> str:
+        """Cut text to limit characters, marking the cut with an ellipsis"""
+        return text[:limit] + "..." if len(text) > limit else text
+    
+    @staticmethod
+    def _truncate_to_tokens(text: str, budget: int) -> str:
+        """Cut text to roughly budget tokens at a word boundary, marking the cut with an ellipsis"""
+        limit = budget * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        cut = text.rfind(" ", 0, limit)
+        return text[:cut if cut > 0 else limit] + "..."
+    
+    def _route_categories(self, question: str) -> set:
+        """Collect every tool-routing keyword category present in the question in one pass"""
+        return {match.lastgroup for match in _ROUTING_RE.finditer(question)}
+    
+    @staticmethod
+    def _normalize_embedding(embedding: List[float]) -> np.ndarray:
+        """L2-normalize an embedding so dot products are cosine similarities"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    @staticmethod
+    def _quantize_embedding(vector: np.ndarray) -> np.ndarray:
+        """Map a unit-normalized embedding to int8 (4x smaller than float32)"""
+        scaled = np.rint(np.asarray(vector, dtype=np.float32) * EMBEDDING_QUANT_SCALE)
+        return np.clip(scaled, -EMBEDDING_QUANT_SCALE, EMBEDDING_QUANT_SCALE).astype(np.int8)
+    
+    def _semantic_cache_lookup(self, query_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return a cached result for a near-duplicate question, if any"""
+        # Accumulate in int32: int8 x int8 products summed over 768 dims overflow int16
+        query_q8 = self._quantize_embedding(query_vector).astype(np.int32)
+        return self._semantic_cache.lookup(query_q8, self.semantic_cache_threshold * EMBEDDING_QUANT_SCALE ** 2)
+    
+    def _semantic_cache_store(self, query_vector: np.ndarray, result: Dict[str, Any]):
+        """Remember a RAG result under its query embedding"""
+        self._semantic_cache.store(self._quantize_embedding(query_vector), result)
+    
+    @staticmethod
+    def _answer_cache_key(question: str, include_related_docs: bool = True, case_sensitive: bool = False) -> bytes:
+        """Digest of the normalized question used as exact-match cache key"""
+        normalized = question.strip() if case_sensitive else question.lower().strip()
+        if not include_related_docs:
+            normalized += "\0no-docs"
+        return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+    
+    def _answer_cache_lookup(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached answer and mark it as recently used"""
+        with self._answer_cache_lock:
+            result = self._answer_cache.get(key)
+            if result is None:
+                return None
+            self._answer_cache.move_to_end(key)
+            return dict(result)
+    
+    def _answer_cache_store(self, key: bytes, result: Dict[str, Any]):
+        """Remember an answer, evicting the least recently used one when full"""
+        with self._answer_cache_lock:
+            self._answer_cache[key] = result
+            self._answer_cache.move_to_end(key)
+            if len(self._answer_cache) > self.answer_cache_size:
+                self._answer_cache.popitem(last=False)
+    
+    def clear_query_cache(self):
+        """Forget cached answers (called whenever the knowledge base changes)"""
+        self._semantic_cache.clear()
+        with self._answer_cache_lock:
+            self._answer_cache.clear()
     
     def similarity_search(self, query: str, k: int = 5) -> List[Document]:
         """Direct similarity search for debugging"""
@@ -397,21 +921,28 @@ Provide a comprehensive answer:"""
         
         return self.vectorstore.similarity_search(query, k=k)
     
+    def _doc_count(self) -> int:
+        """Number of chunks in the collection (a single COUNT(*) in Chroma's SQLite store)"""
+        return self.vectorstore._collection.count()
+    
     def get_collection_info(self) -> Dict[str, Any]:
         """Get collection information"""
         if not self.vectorstore:
             return {"error": "Vector store not initialized"}
         
         try:
-            collection_data = self.vectorstore.get()
+            count = self._doc_count()
             metadata = self._load_metadata()
+            # Display-only digest, derived on demand from the stored manifest
+            manifest = metadata.get('pdf_manifest')
+            fingerprint = self._fingerprint_manifest(manifest)[:8] if manifest is not None else 'unknown'
             
             return {
                 "name": self.collection_name,
-                "count": len(collection_data['ids']),
+                "count": count,
                 "directory": self.persist_directory,
                 "created_at": metadata.get('created_at'),
-                "pdf_fingerprint": metadata.get('pdf_fingerprint', 'unknown')[:8]
+                "pdf_fingerprint": fingerprint
             }
         except Exception as e:
             return {"error": f"Failed to get collection info: {str(e)}"}
@@ -420,12 +951,12 @@ Provide a comprehensive answer:"""
         """Process a single PDF file and return documents"""
         from src.document_processor import SalesforceDocumentProcessor
         
-        print(f"📄 Processing single PDF: {os.path.basename(pdf_path)}")
+        logger.info("Processing single PDF: %s", os.path.basename(pdf_path))
         processor = SalesforceDocumentProcessor()
         
         # Process just this PDF
-        documents = processor.load_pdf(pdf_path)
-        print(f"📝 Generated {len(documents)} chunks from {os.path.basename(pdf_path)}")
+        documents = list(processor.load_pdf(pdf_path))
+        logger.info("Generated %s chunks from %s", len(documents), os.path.basename(pdf_path))
         
         return documents
     
@@ -435,98 +966,122 @@ Provide a comprehensive answer:"""
             raise ValueError("Vector store not initialized")
         
         filename = os.path.basename(pdf_path)
-        print(f"➕ Adding {len(documents)} documents from {filename}...")
+        logger.info("Adding %s documents from %s...", len(documents), filename)
         
         try:
-            # Batch add documents for better performance
             if documents:
-                # Add all documents in one batch operation
-                self.vectorstore.add_documents(documents)
+                # Add in fixed-size batches so only one batch of embeddings is held at a time
+                for batch in self._iter_batches(documents, INGEST_BATCH_SIZE):
+                    self.vectorstore.add_documents(batch)
+                self.clear_query_cache()
                 
                 # Skip metadata update for faster uploads (optional)
                 if update_metadata:
                     self._update_metadata_after_change(pdf_path)
                 
                 # Get final count for reporting (lightweight operation)
-                current_count = len(self.vectorstore.get()['ids'])
-                print(f"✅ Added {len(documents)} documents from {filename}. Total: {current_count}")
+                current_count = self._doc_count()
+                logger.info("Added %s documents from %s. Total: %s", len(documents), filename, current_count)
             else:
-                print(f"⚠️ No documents to add from {filename}")
+                logger.warning("No documents to add from %s", filename)
             
         except Exception as e:
-            print(f"❌ Error adding documents from {filename}: {e}")
+            logger.error("Error adding documents from %s: %s", filename, e)
             raise
     
-    def remove_documents_by_source(self, pdf_path: str):
+    def remove_documents_by_source(self, pdf_path: str, update_metadata: bool = True):
         """Remove documents from a specific PDF file using ChromaDB best practices"""
         if not self.vectorstore:
             raise ValueError("Vector store not initialized")
         
         filename = os.path.basename(pdf_path)
-        print(f"🗑️ Removing documents from {filename}...")
+        logger.info("Removing documents from %s...", filename)
         
         try:
             # Use ChromaDB's where clause for efficient deletion
             # This is much faster than getting all documents and filtering
-            delete_result = self.vectorstore.delete(where={"source_file": filename})
-            
-            # Check how many were deleted
-            if hasattr(delete_result, '__len__'):
-                deleted_count = len(delete_result) if delete_result else 0
-            else:
-                # Fallback: check collection count before/after
-                deleted_count = "unknown"
+            count_before = self._doc_count()
+            self.vectorstore._collection.delete(where={"source_file": filename})
+            self.clear_query_cache()
             
-            print(f"🗑️ Removed {deleted_count} documents from {filename}")
+            # Two COUNT(*) queries give the number deleted without listing ids
+            current_count = self._doc_count()
+            logger.info("Removed %s documents from %s", count_before - current_count, filename)
             
             # Update metadata after deletion
-            self._update_metadata_after_change(pdf_path)
+            if update_metadata:
+                self._update_metadata_after_change(pdf_path, current_count)
                 
         except Exception as e:
-            print(f"❌ Error removing documents from {filename}: {e}")
+            logger.error("Error removing documents from %s: %s", filename, e)
             # Don't raise - continue processing
     
-    def _update_metadata_after_change(self, pdf_path: str):
+    def _update_metadata_after_change(self, pdf_path: str, current_count: Optional[int] = None):
         """Update metadata after vector store changes"""
         try:
             pdf_directory = os.path.dirname(pdf_path)
-            new_fingerprint = self._get_pdf_fingerprint(pdf_directory)
-            current_count = len(self.vectorstore.get()['ids'])
-            self._save_metadata(new_fingerprint, current_count)
+            # The changed file may have been rewritten in place, which leaves the directory mtime alone
+            self._manifest_cache.pop(pdf_directory, None)
+            pdf_manifest = self._get_pdf_manifest(pdf_directory)
+            if current_count is None:
+                current_count = self._doc_count()
+            self._save_metadata(current_count, pdf_manifest)
         except Exception as e:
-            print(f"⚠️ Warning: Could not update metadata: {e}")
+            logger.warning("Could not update metadata: %s", e)
     
     def handle_file_change(self, file_path: str, event_type: str):
-        """Handle real-time file changes with duplicate prevention"""
+        """Queue a real-time file change; bursts for the same file collapse into one action"""
+        with self._pending_lock:
+            previous = self._pending_events.get(file_path)
+            if event_type == "created" and previous is not None:
+                # Earlier events may have left chunks behind, so replace rather than add
+                event_type = "modified"
+            self._pending_events[file_path] = event_type
+            
+            if self._pending_timer is not None:
+                self._pending_timer.cancel()
+            self._pending_timer = threading.Timer(FILE_EVENT_DEBOUNCE_SECONDS, self._flush_file_events)
+            self._pending_timer.daemon = True
+            self._pending_timer.start()
+    
+    def _flush_file_events(self):
+        """Process the coalesced watcher events once the burst has settled"""
+        with self._pending_lock:
+            events, self._pending_events = self._pending_events, {}
+            self._pending_timer = None
+        
+        for file_path, event_type in events.items():
+            self._process_file_change(file_path, event_type)
+    
+    def _process_file_change(self, file_path: str, event_type: str):
+        """Handle a single file change with duplicate prevention"""
         filename = os.path.basename(file_path)
-        print(f"🔄 Processing file change: {event_type} - {filename}")
+        logger.info("Processing file change: %s - %s", event_type, filename)
         
-        # Skip processing if file doesn't exist or isn't a PDF
-        if not os.path.exists(file_path) or not file_path.lower().endswith('.pdf'):
-            print(f"⚠️ Skipping non-PDF or missing file: {filename}")
+        # Skip processing if file isn't a PDF or (unless deleted) no longer exists
+        if not file_path.lower().endswith('.pdf') or (event_type != "deleted" and not os.path.exists(file_path)):
+            logger.warning("Skipping non-PDF or missing file: %s", filename)
             return
         
-        # Check if we're already processing this file
-        processing_key = f"processing_{filename}"
-        if hasattr(self, processing_key) and getattr(self, processing_key, False):
-            print(f"⏳ Already processing {filename}, skipping duplicate...")
-            return
+        # Check if we're already processing this file, marking it as processing if not
+        with self._in_flight_lock:
+            if filename in self._in_flight:
+                logger.info("Already processing %s, skipping duplicate...", filename)
+                return
+            self._in_flight.add(filename)
         
         try:
-            # Mark as processing
-            setattr(self, processing_key, True)
-            
             if event_type == "created" or event_type == "modified":
                 # For modifications, remove existing documents first
                 if event_type == "modified":
-                    print(f"🗑️ Removing existing documents for modified file: {filename}")
+                    logger.info("Removing existing documents for modified file: %s", filename)
                     self.remove_documents_by_source(file_path)
                 
                 # Process and add new documents
-                print(f"📄 Processing {filename}...")
+                logger.info("Processing %s...", filename)
                 documents = self.process_single_pdf(file_path)
                 if documents:
-                    print(f"➕ Adding {len(documents)} documents from {filename}")
+                    logger.info("Adding %s documents from %s", len(documents), filename)
                     self.add_documents_to_vectorstore(documents, file_path)
                     monitor.log_system_event("pdf_processed", {
                         "filename": filename,
@@ -534,20 +1089,20 @@ Provide a comprehensive answer:"""
                         "document_count": len(documents)
                     })
                 else:
-                    print(f"⚠️ No documents generated from {filename}")
+                    logger.warning("No documents generated from %s", filename)
                     
             elif event_type == "deleted":
                 # Remove documents from deleted PDF
-                print(f"🗑️ Removing documents for deleted file: {filename}")
+                logger.info("Removing documents for deleted file: %s", filename)
                 self.remove_documents_by_source(file_path)
                 monitor.log_system_event("pdf_removed", {
                     "filename": filename
                 })
             
-            print(f"✅ Successfully processed {event_type} event for {filename}")
+            logger.info("Successfully processed %s event for %s", event_type, filename)
             
         except Exception as e:
-            print(f"❌ Error handling file change for {filename}: {e}")
+            logger.error("Error handling file change for %s: %s", filename, e)
             monitor.log_system_event("file_change_error", {
                 "filename": filename,
                 "event_type": event_type,
@@ -556,4 +1111,5 @@ Provide a comprehensive answer:"""
             # Don't re-raise to prevent breaking the watcher
         finally:
             # Mark as not processing
-            setattr(self, processing_key, False)
\ No newline at end of file
+            with self._in_flight_lock:
+                self._in_flight.discard(filename)
\ No newline at end of file
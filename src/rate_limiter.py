@@ -1,14 +1,29 @@
+import os
 import time
 import threading
+import uuid
 from collections import defaultdict, deque
 from typing import Dict, Optional, Any
 from functools import wraps
 import streamlit as st
 
+# Set RATE_LIMIT_ENABLED=0 to turn rate limiting off (single-user / development setups)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+
 class RateLimiter:
     def __init__(self):
         self.requests = defaultdict(deque)  # user_id -> deque of request timestamps
-        self.lock = threading.Lock()
+        self.minute_requests = defaultdict(deque)  # user_id -> timestamps from the last minute only
+        
+        # Per-user locks so different users never wait on each other; the registry
+        # lock only guards creating/removing entries in the per-user dicts
+        self.locks = defaultdict(threading.Lock)
+        self.registry_lock = threading.Lock()
+        # user_id -> requests that looked up the user's entries and have not finished
+        # with them yet; the sweep never drops a user with pending requests
+        self.pending = defaultdict(int)
+        self.sweep_interval = 600  # seconds between sweeps of idle users
+        self.last_sweep = time.time()
         
         # Rate limits (requests per time window)
         self.limits = {
@@ -19,31 +34,56 @@ class RateLimiter:
         }
     
     def get_user_id(self) -> str:
-        """Get user identifier (use session state or IP)"""
-        if hasattr(st, 'session_state') and hasattr(st.session_state, 'user_id'):
-            return st.session_state.user_id
-        
-        # Fallback to session hash
+        """Get user identifier (a random id generated once per session)"""
         try:
-            import streamlit.runtime.caching.hashing as hashing
-            return str(hash(str(st.session_state)))[:10]
-        except:
+            user_id = st.session_state.get('user_id')
+            if not user_id:
+                user_id = uuid.uuid4().hex
+                st.session_state['user_id'] = user_id
+            return user_id
+        except Exception:
+            # No Streamlit session (e.g. background threads)
             return "default_user"
     
     def is_allowed(self, request_type: str = "query") -> tuple[bool, Optional[str]]:
         """Check if request is allowed under rate limits"""
+        if not RATE_LIMIT_ENABLED:
+            return True, None
+        
         user_id = self.get_user_id()
         current_time = time.time()
         
-        with self.lock:
+        if current_time - self.last_sweep > self.sweep_interval:
+            self._sweep_idle_users(current_time)
+        
+        with self.registry_lock:
+            user_lock = self.locks[user_id]
             user_requests = self.requests[user_id]
-            
-            # Clean old requests (older than 1 hour)
+            recent_requests = self.minute_requests[user_id]
+            self.pending[user_id] += 1
+        
+        try:
+            return self._check_and_record(user_lock, user_requests, recent_requests,
+                                          request_type, current_time)
+        finally:
+            with self.registry_lock:
+                self.pending[user_id] -= 1
+                if not self.pending[user_id]:
+                    del self.pending[user_id]
+    
+    def _check_and_record(self, user_lock: threading.Lock, user_requests: deque, recent_requests: deque,
+                          request_type: str, current_time: float) -> tuple[bool, Optional[str]]:
+        """Apply the limits to one user's request windows and record the request if allowed"""
+        with user_lock:
+            # Clean old requests (older than 1 hour / 1 minute); timestamps are in
+            # arrival order, so both windows only ever drop from the left
             while user_requests and current_time - user_requests[0] > 3600:
                 user_requests.popleft()
+            while recent_requests and current_time - recent_requests[0] >= 60:
+                recent_requests.popleft()
             
             # Count requests in different time windows
-            minute_count = sum(1 for req_time in user_requests if current_time - req_time < 60)
+            minute_count = len(recent_requests)
             hour_count = len(user_requests)
             
             # Check limits based on request type
@@ -60,13 +100,31 @@ class RateLimiter:
             
             # Add current request
             user_requests.append(current_time)
+            recent_requests.append(current_time)
             return True, None
+    
+    def _sweep_idle_users(self, current_time: float):
+        """Drop deques and locks of users with no request in the last hour"""
+        with self.registry_lock:
+            self.last_sweep = current_time
+            for user_id in list(self.requests):
+                if user_id in self.pending:
+                    continue
+                user_requests = self.requests[user_id]
+                if not user_requests or current_time - user_requests[-1] > 3600:
+                    del self.requests[user_id]
+                    self.minute_requests.pop(user_id, None)
+                    self.locks.pop(user_id, None)
 
 # Global rate limiter
 rate_limiter = RateLimiter()
 
 def rate_limit(request_type: str = "query"):
     """Decorator for rate limiting"""
+    if not RATE_LIMIT_ENABLED:
+        # Leave the function undecorated so disabled limits cost nothing per call
+        return lambda func: func
+    
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -1,7 +1,224 @@
-from langchain.tools import tool
 import re
 import json
+import logging
 import html
+import asyncio
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Union
+try:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except covers both
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+logger = logging.getLogger(__name__)
+
+# Identical tool inputs are common within one agent conversation
+TOOL_CACHE_SIZE = 512
+
+SYNC_LIMITS = {
+    'soql_queries': 100,
+    'dml_statements': 150,
+    'dml_records': 10000,
+    'heap_size_mb': 6,
+    'cpu_time_ms': 10000,
+    'callouts': 100,
+    'email_invocations': 10,
+    'future_calls': 50,
+    'queueable_jobs': 50
+}
+
+# Usage above these percentages of a limit is flagged
+CRITICAL_USAGE_PERCENT = 80
+WARNING_USAGE_PERCENT = 60
+
+# Status codes returned by score_limit_usage
+STATUS_OK, STATUS_WARNING, STATUS_CRITICAL = 0, 1, 2
+_STATUS_ICONS = ("🟢", "🟡", "🔴")
+
+# Column order for batch scoring
+_LIMIT_KEYS = tuple(SYNC_LIMITS)
+_LIMIT_INDEX = {key: i for i, key in enumerate(_LIMIT_KEYS)}
+
+@lru_cache(maxsize=None)
+def _limit_thresholds():
+    """Precomputed so scoring needs no division: percent per unit used, and the
+    usage amounts at which each limit turns warning / critical (NumPy loads on first use)"""
+    import numpy as np
+    
+    limit_values = np.array([SYNC_LIMITS[key] for key in _LIMIT_KEYS], dtype=np.float64)
+    return (100.0 / limit_values,
+            limit_values * WARNING_USAGE_PERCENT / 100,
+            limit_values * CRITICAL_USAGE_PERCENT / 100)
+
+_TAG_RE = re.compile(r'<[^>]+>')
+# Common HTML entities (case-insensitive) that clean_input replaces by hand
+_HTML_ENTITIES = {
+    '&lt;': '<',
+    '&gt;': '>',
+    '&amp;': '&',
+    '&#x27;': "'",
+    '&#39;': "'",
+    '&quot;': '"',
+    '&apos;': "'",
+    '&nbsp;': ' ',
+    '&#60;': '<',
+    '&#62;': '>',
+    '&#38;': '&',
+    '&#34;': '"'
+}
+_HTML_ENTITY_RE = re.compile('|'.join(map(re.escape, _HTML_ENTITIES)), re.IGNORECASE)
+
+# Loop headers, SOQL and DML in one alternation, scanned once over the whole
+# source. Each alternative sits in a lookahead so overlapping constructs on a
+# line are all reported, and none of them may cross a line break.
+_APEX_SCAN_PATTERN = (
+    r'(?=(?P<for>\bfor[^\S\n]*\((?:[^:)\n]*;[^;)\n]*;[^)\n]*|[^)\n]*:[^)\n]*)\))'
+    r'|(?P<while>\bwhile[^\S\n]*\([^)\n]*\))'
+    r'|(?P<do>\bdo[^\S\n]*\{)'
+    r'|(?P<soql>\[[^\n]*?select[^\n]*?\]'
+    r'|database\.(?:query|querywithbinds|getquerylocator)[^\S\n]*\('
+    r'|\.query[^\S\n]*\()'
+    r'|(?P<dml>\b(?:insert|update|delete|upsert)[^\S\n]+'
+    r'|database\.(?:insert|update|delete|upsert)[^\S\n]*\())'
+)
+_APEX_SCAN_RE = re.compile(_APEX_SCAN_PATTERN, re.IGNORECASE)
+# The pattern is all lowercase, so lowercased ASCII source can be scanned
+# without case folding; lower() keeps ASCII offsets in place
+_APEX_SCAN_ASCII_RE = re.compile(_APEX_SCAN_PATTERN)
+_LOOP_TYPES = {'for': 'for', 'while': 'while', 'do': 'do-while'}
+
+# The same rules for Hyperscan, which reports every match of every expression
+# in one SIMD pass; used when the optional package is installed
+_HS_EXPRESSIONS = (
+    ('for', rb'\bfor[^\S\n]*\((?:[^:)\n]*;[^;)\n]*;[^)\n]*|[^)\n]*:[^)\n]*)\)'),
+    ('while', rb'\bwhile[^\S\n]*\([^)\n]*\)'),
+    ('do', rb'\bdo[^\S\n]*\{'),
+    ('soql', rb'\[[^\n]*SELECT[^\n]*\]'),
+    ('soql', rb'Database\.(?:query|queryWithBinds|getQueryLocator)[^\S\n]*\('),
+    ('soql', rb'\.query[^\S\n]*\('),
+    ('dml', rb'\b(?:insert|update|delete|upsert)[^\S\n]+'),
+    ('dml', rb'Database\.(?:insert|update|delete|upsert)[^\S\n]*\('),
+)
+
+@lru_cache(maxsize=None)
+def _hyperscan_database():
+    """Compile the Hyperscan database on first use rather than at import"""
+    if hyperscan is None:
+        return None
+    try:
+        database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        database.compile(
+            expressions=[expression for _, expression in _HS_EXPRESSIONS],
+            ids=list(range(len(_HS_EXPRESSIONS))),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(_HS_EXPRESSIONS)
+        )
+    except hyperscan.HyperscanError as e:
+        logger.warning("Hyperscan unavailable, using the regex scanner: %s", e)
+        return None
+    return database
+
+# Scratch space can't be shared between concurrent scans
+_hs_local = threading.local()
+
+# Keywords the whole-file checks look for, found in one scan of the source
+_REVIEW_KEYWORDS = (
+    'system.debug', 'system.assert', 'trigger', 'trigger.new',
+    'trigger.isinsert', 'trigger.isupdate', 'list<', 'set<', 'map<', '@istest',
+    'testmethod', 'test.starttest()', 'without sharing'
+)
+# try/catch need word boundaries (not 'entry' or 'catchup'), so they get their
+# own alternatives; keywords go longest first so 'trigger.new' wins over
+# 'trigger' at the same offset
+_KEYWORD_RE = re.compile(
+    r'(?=(?P<try>\btry\s*\{)|(?P<catch>\bcatch\s*\()|(?P<keyword>' + '|'.join(
+        re.escape(k) for k in sorted(_REVIEW_KEYWORDS, key=len, reverse=True)
+    ) + '))'
+)
+# A keyword match also implies every keyword that is a prefix of it
+_KEYWORD_IMPLIES = {
+    k: frozenset(p for p in _REVIEW_KEYWORDS if k.startswith(p)) for k in _REVIEW_KEYWORDS
+}
+
+# Quoted 15 or 18 character alphanumeric literals; candidates for record IDs
+_ID_CANDIDATE_RE = re.compile(r"['\"]([0-9a-zA-Z]{15}(?:[0-9a-zA-Z]{3})?)(?=['\"])")
+_ID_CHECKSUM_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ012345"
+
+_LARGE_OBJECTS = ('account', 'contact', 'opportunity', 'lead', 'case')
+# SOQL clause keywords (matched as substrings, like the checks that use them);
+# a FROM on one of the large objects also captures the object name
+_SOQL_KEYWORD_RE = re.compile(
+    r'select|from(?: (' + '|'.join(_LARGE_OBJECTS) + r'))?|where|limit|count\(\)|like'
+)
+
+# Substring matches, as before: 'accountid' counts as an indexed field reference
+_LARGE_OBJECT_RE = re.compile('|'.join(_LARGE_OBJECTS))
+_INDEXED_FIELD_RE = re.compile(r'id|name|email|createddate|lastmodifieddate')
+
+# Where a WHERE clause ends: a nested WHERE, or the next clause keyword (bounded,
+# so fields like Credit_Limit__c don't end it)
+_WHERE_END_RE = re.compile(r'where|\b(?:order\s+by|group\s+by|limit)\b')
+
+# Date functions such as DAY() or CALENDAR_YEAR() in a WHERE clause
+_DATEFN_RE = re.compile(r'(?:day|month|year|hour)\(')
+# String literals are left alone since LIKE patterns and dots inside them matter
+_NUMERIC_LITERAL_RE = re.compile(r'\b\d+\b')
+_LIKE_WILDCARD_RE = re.compile(r"like\s+['\"]%")
+_OPERATION_COUNT_RE = re.compile(r'(\d+)\s*(soql|dml)')
+_OPERATION_KEYS = {'soql': 'soql_queries', 'dml': 'dml_statements'}
+
+# Static report sections, built once at import
+_APEX_CHECKLIST = (
+    "📚 **APEX BEST PRACTICES CHECKLIST:**\n"
+    "• Always bulkify your code for large data volumes\n"
+    "• Avoid SOQL/DML operations inside loops\n"
+    "• Use proper exception handling with specific exception types\n"
+    "• Implement trigger patterns (One Trigger Per Object)\n"
+    "• Use Test.startTest()/stopTest() in unit tests\n"
+    "• Follow naming conventions (CamelCase for classes, camelCase for variables)\n"
+    "• Use 'with sharing' for security enforcement\n"
+    "• Avoid hardcoded IDs and values\n"
+)
+
+_SOQL_REPORT_HEADER = "🔍 **SOQL QUERY ANALYSIS REPORT**\n\n**Query:** `{query}`\n\n"
+
+_SOQL_BEST_PRACTICES = (
+    "📈 **SOQL BEST PRACTICES:**\n"
+    "• Use selective WHERE clauses with indexed fields\n"
+    "• Avoid leading wildcards in LIKE (use trailing: 'test%')\n"
+    "• For full-text search, use SOSL instead of SOQL\n"
+    "• Use LIMIT to control result set size\n"
+    "• Avoid functions in WHERE clauses when possible\n"
+    "• Query only the fields you need\n"
+    "• Use relationship queries efficiently (limit depth)\n"
+    "• Consider using WITH SECURITY_ENFORCED for user context\n"
+)
+
+_SOSL_ALTERNATIVE = (
+    "\n💡 **ALTERNATIVE APPROACH:**\n"
+    "For text searching, consider using SOSL instead:\n"
+    "```\n"
+    "FIND {search term} IN ALL FIELDS\n"
+    "RETURNING Account(Id, Name), Contact(Id, Name)\n"
+    "```\n"
+)
+
+_GOVERNOR_LIMITS_TAIL = (
+    "• Always test with large data volumes\n"
+    "• Implement proper error handling for limit exceptions\n"
+    "• Consider asynchronous processing for large operations\n"
+    "\n📚 **GOVERNOR LIMITS REFERENCE:**\n"
+    "• SOQL Queries: 100 (sync) / 200 (async)\n"
+    "• DML Statements: 150 (sync) / 150 (async)\n"
+    "• DML Records: 10,000 per transaction\n"
+    "• Heap Size: 6 MB (sync) / 12 MB (async)\n"
+    "• CPU Time: 10s (sync) / 60s (async)\n"
+)
 
 def clean_input(code: str) -> str:
     """Clean and decode HTML entities from Streamlit input"""
@@ -11,40 +228,24 @@ def clean_input(code: str) -> str:
     # More aggressive HTML entity cleaning
     cleaned = code
     
-    # Multiple passes to handle double-encoding
-    for _ in range(3):  # Up to 3 passes for nested encoding
-        cleaned = html.unescape(cleaned)
-    
-    # Manual replacement of common HTML entities (case-insensitive)
-    html_entities = {
-        '&lt;': '<',
-        '&LT;': '<',
-        '&gt;': '>',
-        '&GT;': '>',
-        '&amp;': '&',
-        '&AMP;': '&',
-        '&#x27;': "'",
-        '&#X27;': "'",
-        '&#39;': "'",
-        '&quot;': '"',
-        '&QUOT;': '"',
-        '&apos;': "'",
-        '&APOS;': "'",
-        '&nbsp;': ' ',
-        '&NBSP;': ' ',
-        '&#60;': '<',
-        '&#62;': '>',
-        '&#38;': '&',
-        '&#34;': '"'
-    }
-    
-    # Apply replacements multiple times in case of nested encoding
-    for _ in range(2):
-        for entity, replacement in html_entities.items():
-            cleaned = cleaned.replace(entity, replacement)
+    # Plain code (the usual case) has no entities or tags; skip straight to the whitespace pass
+    if '&' in cleaned:
+        # Multiple passes to handle double-encoding
+        for _ in range(3):  # Up to 3 passes for nested encoding
+            unescaped = html.unescape(cleaned)
+            if unescaped == cleaned:
+                break
+            cleaned = unescaped
+        
+        # Entities left over from deeper nesting, replaced in one regex pass per level
+        for _ in range(2):
+            if '&' not in cleaned:
+                break
+            cleaned = _HTML_ENTITY_RE.sub(lambda m: _HTML_ENTITIES[m.group().lower()], cleaned)
     
     # Remove any remaining HTML tags
-    cleaned = re.sub(r'<[^>]+>', '', cleaned)
+    if '<' in cleaned:
+        cleaned = _TAG_RE.sub('', cleaned)
     
     # Fix whitespace issues that might come from HTML formatting
     # Replace multiple spaces with single spaces but preserve indentation
@@ -52,12 +253,11 @@ def clean_input(code: str) -> str:
     fixed_lines = []
     for line in lines:
         # Only fix excessive spaces within the line content, preserve leading spaces
-        if line.strip():  # Only process non-empty lines
-            leading_spaces = len(line) - len(line.lstrip())
-            content = line.strip()
-            # Fix multiple spaces within content
-            content = re.sub(r'  +', ' ', content)
-            fixed_lines.append(' ' * leading_spaces + content)
+        stripped = line.lstrip()
+        if stripped:  # Only process non-empty lines
+            leading_spaces = len(line) - len(stripped)
+            # split() drops trailing whitespace and collapses runs within the content
+            fixed_lines.append(' ' * leading_spaces + ' '.join(stripped.split()))
         else:
             fixed_lines.append(line)
     
@@ -71,18 +271,33 @@ def format_apex_code(code: str) -> str:
     # Code should already be cleaned, don't double-clean
     cleaned = code
     
-    if '\n' in cleaned and len(cleaned.split('\n')) > 3:
+    if cleaned.count('\n') > 2:
         return cleaned
     
-    formatted = cleaned.strip()
-    
-    formatted = re.sub(r'\{\s*', '{\n', formatted)
-    
-    formatted = re.sub(r'\s*\}', '\n}', formatted)
-    
-    formatted = re.sub(r';\s*(?![^(]*\))', ';\n', formatted)
-    
-    formatted = re.sub(r'\n+', '\n', formatted)
+    # Break after '{' and before '}'; whitespace around them goes with the strip below
+    formatted = cleaned.strip().replace('{', '{\n').replace('}', '\n}')
+    
+    # Break after ';' unless it sits inside parentheses (as in a for header), i.e.
+    # unless the next parenthesis after it is a closing one. Walk the segments
+    # between semicolons backwards, carrying the nearest parenthesis seen so far.
+    segments = formatted.split(';')
+    inside_parens = False
+    separators = []
+    for segment in reversed(segments[1:]):
+        open_pos = segment.find('(')
+        close_pos = segment.find(')')
+        if close_pos != -1 and (open_pos == -1 or close_pos < open_pos):
+            inside_parens = True
+        elif open_pos != -1:
+            inside_parens = False
+        separators.append(';' if inside_parens else ';\n')
+    separators.reverse()
+    
+    parts = [segments[0]]
+    for separator, segment in zip(separators, segments[1:]):
+        parts.append(separator)
+        parts.append(segment)
+    formatted = ''.join(parts)
     
     lines = []
     for line in formatted.split('\n'):
@@ -93,17 +308,9 @@ def format_apex_code(code: str) -> str:
     return '\n'.join(lines)
 
 
-@tool
-def apex_code_reviewer(code: str) -> str:
-    """
-    Review Apex code for best practices, governor limits compliance, and potential issues.
-    
-    Args:
-        code: The Apex code to review
-        
-    Returns:
-        A detailed review with recommendations and best practices
-    """
+@lru_cache(maxsize=TOOL_CACHE_SIZE)
+def _review_apex_code(code: str) -> str:
+    """Review Apex code; results are cached per input"""
     
     if not code or not code.strip():
         return "Please provide Apex code to review."
@@ -111,243 +318,197 @@ def apex_code_reviewer(code: str) -> str:
     # FIRST: Clean HTML entities immediately
     cleaned_code = clean_input(code)
     
-    # Enhanced debug logging with LangSmith tracing
-    debug_info = {
-        "original_code": repr(code),
-        "cleaned_code": repr(cleaned_code),
-        "code_length": len(code),
-        "cleaned_length": len(cleaned_code),
-        "code_type": str(type(code)),
-        "execution_context": "streamlit" if hasattr(__builtins__, '__IPYTHON__') or 'streamlit' in str(globals()) else "local",
-        "has_html_entities": "&lt;" in code or "&#x27;" in code or "&gt;" in code
-    }
-
     # Use cleaned code for formatting instead of original
     formatted_code = format_apex_code(cleaned_code)
     
-    formatting_debug = {
-        "formatted_code": repr(formatted_code),
-        "formatted_length": len(formatted_code),
-        "lines_count": len(formatted_code.split('\n')),
-        "formatting_changed": code != formatted_code
-    }
-    
     issues = []
-    recommendations = []
-    lines = formatted_code.split('\n')
-    
-    soql_patterns = [
-        r'\[[\s\S]*?SELECT[\s\S]*?\]',
-        r'Database\.query\s*\(',
-        r'Database\.queryWithBinds\s*\(',
-        r'Database\.getQueryLocator\s*\(',
-        r'\.query\s*\('
-    ]
-    
-    dml_patterns = [
-        r'\binsert\s+',
-        r'\bupdate\s+', 
-        r'\bdelete\s+',
-        r'\bupsert\s+',
-        r'Database\.insert\s*\(',
-        r'Database\.update\s*\(',
-        r'Database\.delete\s*\(',
-        r'Database\.upsert\s*\('
-    ]
-    
-    loop_patterns = [
-        (r'\bfor\s*\([^:)]*;[^;)]*;[^)]*\)', 'for'), 
-        (r'\bfor\s*\([^)]*:\s*[^)]*\)', 'for'),
-        (r'\bwhile\s*\([^)]*\)', 'while'),
-        (r'\bdo\s*\{', 'do-while')
-    ]
+    # Insertion-ordered and deduplicated; a finding repeated on many lines is recommended once
+    recommendations = {}
     
     loop_stack = []
     current_brace_level = 0
     
-    for i, line in enumerate(lines, 1):
-        line_clean = line.strip()
-        line_lower = line_clean.lower()
+    markers = _scan_apex_markers(formatted_code)
+    marker_index = 0
+    
+    # Walk the buffer line by line through offsets, without slicing out each line
+    code_length = len(formatted_code)
+    line_start = 0
+    i = 0
+    while line_start <= code_length:
+        i += 1
+        line_end = formatted_code.find('\n', line_start)
+        if line_end == -1:
+            line_end = code_length
         
-        open_braces = line_clean.count('{')
-        braces_closed = line_clean.count('}')
+        open_braces = formatted_code.count('{', line_start, line_end)
+        braces_closed = formatted_code.count('}', line_start, line_end)
+        
+        # Collect the markers from the single scan that fall on this line
+        loop_type = None
+        has_soql = has_dml = False
+        while marker_index < len(markers) and markers[marker_index][0] < line_end:
+            kind = markers[marker_index][1]
+            if kind == 'soql':
+                has_soql = True
+            elif kind == 'dml':
+                has_dml = True
+            elif loop_type is None:
+                loop_type = _LOOP_TYPES[kind]
+            marker_index += 1
                 
-        for loop_pattern, loop_type in loop_patterns:
-            if re.search(loop_pattern, line_lower):
-                print(f"DEBUG - Found {loop_type} loop at line {i}: {line_clean}")
-                if '{' in line_clean:
-                    loop_stack.append((i, loop_type, current_brace_level + open_braces))
-                elif ';' in line_clean:
-                    print(f"DEBUG - Single-line {loop_type} loop detected at line {i}")
-                    for soql_pattern in soql_patterns:
-                        if re.search(soql_pattern, line, re.IGNORECASE):
-                            print(f"DEBUG - SOQL pattern matched in single-line loop: {soql_pattern}")
-                            issues.append(f"Line {i}: SOQL in single-line {loop_type} loop - Governor limit violation!")
-                            recommendations.append("Move SOQL queries outside loops and use bulk operations with collections")
-                    for dml_pattern in dml_patterns:
-                        if re.search(dml_pattern, line_lower):
-                            print(f"DEBUG - DML pattern matched in single-line loop: {dml_pattern}")
-                            issues.append(f"Line {i}: DML in single-line {loop_type} loop - Governor limit violation!")
-                            recommendations.append("Collect records in collections and perform bulk DML operations outside loops")
-                else:
-                    loop_stack.append((i, loop_type, current_brace_level + 1))
-                break
+        if loop_type:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Found %s loop at line %d: %s", loop_type, i, formatted_code[line_start:line_end].strip())
+            if open_braces:
+                loop_stack.append((i, loop_type, current_brace_level + open_braces))
+            elif formatted_code.find(';', line_start, line_end) != -1:
+                logger.debug("Single-line %s loop detected at line %d", loop_type, i)
+                if has_soql:
+                    issues.append(f"Line {i}: SOQL in single-line {loop_type} loop - Governor limit violation!")
+                    recommendations["Move SOQL queries outside loops and use bulk operations with collections"] = None
+                if has_dml:
+                    issues.append(f"Line {i}: DML in single-line {loop_type} loop - Governor limit violation!")
+                    recommendations["Collect records in collections and perform bulk DML operations outside loops"] = None
+            else:
+                loop_stack.append((i, loop_type, current_brace_level + 1))
             
         current_brace_level += open_braces
         
         # Only check for SOQL/DML inside loops if we're actually inside a loop AND not on a closing brace line
         if loop_stack and braces_closed == 0:
+            loop_line, loop_type, _ = loop_stack[-1]
+            
             # Check SOQL in loop
-            for soql_pattern in soql_patterns:
-                if re.search(soql_pattern, line, re.IGNORECASE):
-                    loop_line, loop_type, _ = loop_stack[-1]
-                    issues.append(f"Line {i}: SOQL query in {loop_type} loop (started at line {loop_line}) - Governor limit violation!")
-                    recommendations.append("Move SOQL queries outside loops and use bulk operations with collections")
-                    break
+            if has_soql:
+                issues.append(f"Line {i}: SOQL query in {loop_type} loop (started at line {loop_line}) - Governor limit violation!")
+                recommendations["Move SOQL queries outside loops and use bulk operations with collections"] = None
             
             # Check DML in loop
-            for dml_pattern in dml_patterns:
-                if re.search(dml_pattern, line_lower):
-                    loop_line, loop_type, _ = loop_stack[-1]
-                    issues.append(f"Line {i}: DML operation in {loop_type} loop (started at line {loop_line}) - Governor limit violation!")
-                    recommendations.append("Collect records in collections and perform bulk DML operations outside loops")
-                    break
+            if has_dml:
+                issues.append(f"Line {i}: DML operation in {loop_type} loop (started at line {loop_line}) - Governor limit violation!")
+                recommendations["Collect records in collections and perform bulk DML operations outside loops"] = None
         
         # Update brace level first
         current_brace_level -= braces_closed
         
-        # Then check if we've closed any loops
-        if braces_closed > 0 and loop_stack:
-            loop_stack = [(line_num, loop_type, brace_level) 
-                        for line_num, loop_type, brace_level in loop_stack 
-                        if brace_level > current_brace_level]
+        # Then check if we've closed any loops; brace levels never decrease up the
+        # stack, so the closed ones are all on top
+        if braces_closed > 0:
+            while loop_stack and loop_stack[-1][2] > current_brace_level:
+                loop_stack.pop()
+        
+        line_start = line_end + 1
             
     code_lower = cleaned_code.lower()
+    found = set()
+    for match in _KEYWORD_RE.finditer(code_lower):
+        if match.lastgroup == 'keyword':
+            found |= _KEYWORD_IMPLIES[match.group('keyword')]
+        else:
+            found.add(match.lastgroup)
     
-    hardcoded_id_patterns = [
-        r"Id\s*=\s*['\"][0-9a-zA-Z]{15,18}['\"]",
-        r"WHERE\s+Id\s*=\s*['\"][0-9a-zA-Z]{15,18}['\"]",
-        r"['\"][0-9a-zA-Z]{15}[A-Z0-9]{3}['\"]",
-        r"['\"][0-9a-zA-Z]{15}['\"]"
-    ]
-
-    for pattern in hardcoded_id_patterns:
-        if re.search(pattern, cleaned_code, re.IGNORECASE):
-            issues.append("Hardcoded Salesforce IDs detected")
-            recommendations.append("Replace hardcoded IDs with Custom Settings, Custom Metadata, or SOQL queries")
-            break
+    if any(_is_salesforce_id(match.group(1)) for match in _ID_CANDIDATE_RE.finditer(cleaned_code)):
+        issues.append("Hardcoded Salesforce IDs detected")
+        recommendations["Replace hardcoded IDs with Custom Settings, Custom Metadata, or SOQL queries"] = None
     
     # Check for System.debug statements
-    if 'system.debug' in code_lower:
-        recommendations.append("Remove System.debug statements before deploying to production")
+    if 'system.debug' in found:
+        recommendations["Remove System.debug statements before deploying to production"] = None
     
     # Check for try without catch
-    if 'try' in code_lower and 'catch' not in code_lower:
+    if 'try' in found and 'catch' not in found:
         issues.append("Try block without catch - Add proper exception handling")
-        recommendations.append("Always include catch blocks with specific exception types (e.g., DmlException, QueryException)")
+        recommendations["Always include catch blocks with specific exception types (e.g., DmlException, QueryException)"] = None
     
     # Check for trigger best practices
-    if 'trigger' in code_lower and 'trigger.new' in code_lower:
-        if not any(bulk_keyword in code_lower for bulk_keyword in ['list<', 'set<', 'map<']):
-            recommendations.append("Use collections (List, Set, Map) for bulk processing in triggers")
+    if 'trigger' in found and 'trigger.new' in found:
+        if found.isdisjoint(('list<', 'set<', 'map<')):
+            recommendations["Use collections (List, Set, Map) for bulk processing in triggers"] = None
         
         # Check for trigger context usage
-        if 'trigger.new' in code_lower and 'trigger.isinsert' not in code_lower and 'trigger.isupdate' not in code_lower:
-            recommendations.append("Use Trigger context variables (isInsert, isUpdate, isBefore, isAfter) for conditional logic")
+        if 'trigger.new' in found and 'trigger.isinsert' not in found and 'trigger.isupdate' not in found:
+            recommendations["Use Trigger context variables (isInsert, isUpdate, isBefore, isAfter) for conditional logic"] = None
     
     # Check for test class best practices
-    if '@istest' in code_lower or 'testmethod' in code_lower:
-        if 'test.starttest()' not in code_lower:
-            recommendations.append("Use Test.startTest() and Test.stopTest() in test methods to reset governor limits")
-        if 'system.assert' not in code_lower:
-            recommendations.append("Include assertions in test methods to validate expected behavior")
+    if '@istest' in found or 'testmethod' in found:
+        if 'test.starttest()' not in found:
+            recommendations["Use Test.startTest() and Test.stopTest() in test methods to reset governor limits"] = None
+        if 'system.assert' not in found:
+            recommendations["Include assertions in test methods to validate expected behavior"] = None
     
     # Check for sharing and security
-    if 'without sharing' in code_lower:
-        recommendations.append("Consider security implications of 'without sharing' - use 'with sharing' when possible")
+    if 'without sharing' in found:
+        recommendations["Consider security implications of 'without sharing' - use 'with sharing' when possible"] = None
     
     # Generate review report
-    review_report = "🔍 **APEX CODE REVIEW REPORT**\n\n"
+    report_parts = ["🔍 **APEX CODE REVIEW REPORT**\n\n"]
     
     if issues:
-        review_report += "❌ **CRITICAL ISSUES FOUND:**\n"
-        for issue in issues:
-            review_report += f"• {issue}\n"
-        review_report += "\n"
+        report_parts.append("❌ **CRITICAL ISSUES FOUND:**\n")
+        report_parts.extend(f"• {issue}\n" for issue in issues)
+        report_parts.append("\n")
     else:
-        review_report += "✅ **NO CRITICAL ISSUES FOUND**\n\n"
+        report_parts.append("✅ **NO CRITICAL ISSUES FOUND**\n\n")
     
     if recommendations:
-        review_report += "💡 **RECOMMENDATIONS:**\n"
-        for rec in recommendations:
-            review_report += f"• {rec}\n"
-        review_report += "\n"
-    
-    review_report += "📚 **APEX BEST PRACTICES CHECKLIST:**\n"
-    review_report += "• Always bulkify your code for large data volumes\n"
-    review_report += "• Avoid SOQL/DML operations inside loops\n"
-    review_report += "• Use proper exception handling with specific exception types\n"
-    review_report += "• Implement trigger patterns (One Trigger Per Object)\n"
-    review_report += "• Use Test.startTest()/stopTest() in unit tests\n"
-    review_report += "• Follow naming conventions (CamelCase for classes, camelCase for variables)\n"
-    review_report += "• Use 'with sharing' for security enforcement\n"
-    review_report += "• Avoid hardcoded IDs and values\n"
-    
-    # Log final results for comparison
-    results_debug = {
-        "issues_found": len(issues),
-        "recommendations_count": len(recommendations),
-        "issues_list": issues,
-        "recommendations_list": recommendations,
-        "report_length": len(review_report),
-        "execution_context": debug_info['execution_context']
-    }
-
-    return review_report
-
-@tool
-def soql_query_optimizer(query: str) -> str:
-    """
-    Analyze and optimize SOQL queries for performance and best practices.
+        report_parts.append("💡 **RECOMMENDATIONS:**\n")
+        report_parts.extend(f"• {rec}\n" for rec in recommendations)
+        report_parts.append("\n")
     
-    Args:
-        query: The SOQL query to analyze and optimize
-        
-    Returns:
-        Analysis and optimization recommendations for the SOQL query
-    """
+    report_parts.append(_APEX_CHECKLIST)
+    
+    return "".join(report_parts)
+
+def _optimize_soql_query(query: str) -> str:
+    """Analyze a SOQL query, reusing the analysis of any query with the same shape"""
     if not query or not query.strip():
         return "Please provide a SOQL query to analyze."
     
     query = query.strip()
-    query_lower = query.lower()
-    
+    return _SOQL_REPORT_HEADER.format(query=query) + _analyze_soql_query(_canonicalize_soql(query))
+
+def _canonicalize_soql(query: str) -> str:
+    """Lowercase the query and mask numeric literals, which no check depends on"""
+    return _NUMERIC_LITERAL_RE.sub('?', query.lower())
+
+@lru_cache(maxsize=TOOL_CACHE_SIZE)
+def _analyze_soql_query(query_lower: str) -> str:
+    """Findings and guidance for a canonicalized query; cached per canonical form"""
     issues = []
     optimizations = []
     
+    keywords = _scan_soql(query_lower)
+    selects = keywords.get('select', [])
+    has_where = 'where' in keywords
+    has_limit = 'limit' in keywords
+    
     # Check for SELECT *
-    if 'select *' in query_lower:
+    if any(query_lower.startswith(' *', pos + 6) for pos in selects):
         issues.append("Using SELECT * - This is not supported in SOQL")
         optimizations.append("Specify exact fields needed: SELECT Id, Name, Email FROM Account")
     
     # Check for missing WHERE clause on large objects
-    large_objects = ['account', 'contact', 'opportunity', 'lead', 'case']
-    for obj in large_objects:
-        if f'from {obj}' in query_lower and 'where' not in query_lower and 'limit' not in query_lower:
-            issues.append(f"Query on {obj.title()} without WHERE clause or LIMIT - May hit governor limits")
-            optimizations.append(f"Add WHERE clause or LIMIT to queries on {obj.title()}")
+    if not has_where and not has_limit:
+        for obj in _LARGE_OBJECTS:
+            if f'from {obj}' in keywords:
+                issues.append(f"Query on {obj.title()} without WHERE clause or LIMIT - May hit governor limits")
+                optimizations.append(f"Add WHERE clause or LIMIT to queries on {obj.title()}")
     
     # Check for inefficient WHERE clauses
-    if 'where' in query_lower:
-        where_clause = query_lower.split('where')[1].split('order by')[0] if 'order by' in query_lower else query_lower.split('where')[1]
+    if has_where:
+        # Text between the first WHERE and the clause that follows it
+        where_start = keywords['where'][0] + 5
+        where_end_match = _WHERE_END_RE.search(query_lower, where_start)
+        where_end = where_end_match.start() if where_end_match else len(query_lower)
         
         # Check for functions in WHERE clause
-        if any(func in where_clause for func in ['day(', 'month(', 'year(', 'hour(']):
+        if _DATEFN_RE.search(query_lower, where_start, where_end):
             issues.append("Date functions in WHERE clause can prevent index usage")
             optimizations.append("Use date literals instead of date functions when possible")
         
         # Check for LIKE with leading wildcards - FIXED RECOMMENDATION
-        if re.search(r"like\s+['\"]%", where_clause):
+        if _LIKE_WILDCARD_RE.search(query_lower, where_start, where_end):
             issues.append("LIKE with leading wildcard (%) prevents index usage")
             optimizations.append("Avoid leading wildcards in LIKE clauses. Consider:")
             optimizations.append("  • Use SOSL with FIND for full-text search across multiple fields")
@@ -355,112 +516,80 @@ def soql_query_optimizer(query: str) -> str:
             optimizations.append("  • Create custom indexed fields for common search patterns")
     
     # Check for missing LIMIT on queries that should have it
-    if 'limit' not in query_lower and 'count()' not in query_lower:
+    if not has_limit and 'count()' not in keywords:
         optimizations.append("Consider adding LIMIT clause to prevent large result sets")
     
     # Check for unnecessary fields
-    if 'select' in query_lower:
-        select_clause = query_lower.split('from')[0].replace('select', '').strip()
+    if selects:
+        froms = keywords.get('from')
+        select_clause = query_lower[:froms[0] if froms else len(query_lower)].replace('select', '').strip()
         if 'id,' in select_clause and select_clause.count(',') > 10:
             optimizations.append("Consider if all selected fields are necessary - fewer fields = better performance")
     
     # Check for relationship queries depth
-    dot_count = query.count('.')
+    dot_count = query_lower.count('.')
     if dot_count > 5:
         issues.append("Deep relationship queries detected - May impact performance")
         optimizations.append("Consider separate queries or reducing relationship depth")
     
     # Check for subqueries
-    if 'select' in query_lower and query_lower.count('select') > 1:
+    if len(selects) > 1:
         optimizations.append("Subqueries detected - Ensure they're necessary and optimized")
     
     # Check for proper filtering on large objects
-    if any(obj in query_lower for obj in large_objects):
-        if 'where' in query_lower and not any(indexed_field in where_clause for indexed_field in ['id', 'name', 'email', 'createddate', 'lastmodifieddate']):
+    if _LARGE_OBJECT_RE.search(query_lower):
+        if has_where and not _INDEXED_FIELD_RE.search(query_lower, where_start, where_end):
             optimizations.append("Consider using indexed fields in WHERE clause (Id, Name, Email, CreatedDate, LastModifiedDate)")
     
     # Generate optimization report
-    report = "🔍 **SOQL QUERY ANALYSIS REPORT**\n\n"
-    report += f"**Query:** `{query}`\n\n"
+    report_parts = []
     
     if issues:
-        report += "❌ **PERFORMANCE ISSUES:**\n"
-        for issue in issues:
-            report += f"• {issue}\n"
-        report += "\n"
+        report_parts.append("❌ **PERFORMANCE ISSUES:**\n")
+        report_parts.extend(f"• {issue}\n" for issue in issues)
+        report_parts.append("\n")
     else:
-        report += "✅ **NO MAJOR ISSUES DETECTED**\n\n"
+        report_parts.append("✅ **NO MAJOR ISSUES DETECTED**\n\n")
     
     if optimizations:
-        report += "⚡ **OPTIMIZATION SUGGESTIONS:**\n"
-        for opt in optimizations:
-            report += f"• {opt}\n"
-        report += "\n"
+        report_parts.append("⚡ **OPTIMIZATION SUGGESTIONS:**\n")
+        report_parts.extend(f"• {opt}\n" for opt in optimizations)
+        report_parts.append("\n")
     
     # FIXED: Accurate SOQL best practices
-    report += "📈 **SOQL BEST PRACTICES:**\n"
-    report += "• Use selective WHERE clauses with indexed fields\n"
-    report += "• Avoid leading wildcards in LIKE (use trailing: 'test%')\n"
-    report += "• For full-text search, use SOSL instead of SOQL\n"
-    report += "• Use LIMIT to control result set size\n"
-    report += "• Avoid functions in WHERE clauses when possible\n"
-    report += "• Query only the fields you need\n"
-    report += "• Use relationship queries efficiently (limit depth)\n"
-    report += "• Consider using WITH SECURITY_ENFORCED for user context\n"
+    report_parts.append(_SOQL_BEST_PRACTICES)
     
     # Add SOSL recommendation for text search
-    if 'like' in query_lower and '%' in query_lower:
-        report += "\n💡 **ALTERNATIVE APPROACH:**\n"
-        report += "For text searching, consider using SOSL instead:\n"
-        report += "```\n"
-        report += "FIND {search term} IN ALL FIELDS\n"
-        report += "RETURNING Account(Id, Name), Contact(Id, Name)\n"
-        report += "```\n"
-    
-    return report
-
-@tool
-def governor_limits_calculator(operations: str) -> str:
-    """
-    Calculate governor limits usage for given operations and provide guidance.
-    
-    Args:
-        operations: JSON string or description of operations (e.g., '{"soql_queries": 50, "dml_statements": 150, "heap_size_mb": 5}')
-        
-    Returns:
-        Governor limits analysis and recommendations
-    """
+    if 'like' in keywords and '%' in query_lower:
+        report_parts.append(_SOSL_ALTERNATIVE)
+    
+    return "".join(report_parts)
+
+def _calculate_governor_limits(operations: Union[str, Dict[str, Any]]) -> str:
+    """Analyze governor limit usage from a dict of counts, a JSON string, or a description"""
+    # In-process callers can pass the counts directly and skip JSON entirely
+    if isinstance(operations, dict):
+        return analyze_governor_limits_batch([operations])[0]
+    return _analyze_governor_text(operations)
+
+@lru_cache(maxsize=TOOL_CACHE_SIZE)
+def _analyze_governor_text(operations: str) -> str:
+    """Analyze governor limits given as JSON or plain text; results are cached per input"""
     
     if not operations or not operations.strip():
         return "Please provide operations data to analyze governor limits."
     
-    sync_limits = {
-        'soql_queries': 100,
-        'dml_statements': 150,
-        'dml_records': 10000,
-        'heap_size_mb': 6,
-        'cpu_time_ms': 10000,
-        'callouts': 100,
-        'email_invocations': 10,
-        'future_calls': 50,
-        'queueable_jobs': 50
-    }
-    
     try:
-        if operations.startswith('{'):
-            ops_data = json.loads(operations)
+        if operations.lstrip().startswith('{'):
+            ops_data = json_loads(operations)
         else:
-            # Try to extract numbers from description
-            ops_data = {}
-            if 'soql' in operations.lower():
-                soql_match = re.search(r'(\d+)\s*soql', operations.lower())
-                if soql_match:
-                    ops_data['soql_queries'] = int(soql_match.group(1))
-            
-            if 'dml' in operations.lower():
-                dml_match = re.search(r'(\d+)\s*dml', operations.lower())
-                if dml_match:
-                    ops_data['dml_statements'] = int(dml_match.group(1))
+            # Try to extract numbers from description, first mention of each kind wins
+            counts = {}
+            for match in _OPERATION_COUNT_RE.finditer(operations.lower()):
+                counts.setdefault(match.group(2), int(match.group(1)))
+            ops_data = {
+                _OPERATION_KEYS[kind]: counts[kind] for kind in _OPERATION_KEYS if kind in counts
+            }
             
             if not ops_data:
                 return """
@@ -471,65 +600,247 @@ def governor_limits_calculator(operations: str) -> str:
     except json.JSONDecodeError:
         return "Invalid JSON format. Please provide valid JSON or description of operations."
     
-    # Calculate usage percentages and warnings
-    report = "📊 **GOVERNOR LIMITS ANALYSIS**\n\n"
+    return analyze_governor_limits_batch([ops_data])[0]
+
+def analyze_governor_limits_batch(rows: List[Dict[str, Any]]) -> List[str]:
+    """Governor limits reports for many operation snapshots, scored in one NumPy pass"""
+    import numpy as np
+    
+    used = np.array(
+        [[row.get(key, 0) for key in _LIMIT_KEYS] for row in rows], dtype=np.float64
+    ).reshape(len(rows), len(_LIMIT_KEYS))
+    percentages, statuses = _score_usage(used, *_limit_thresholds())
+    return [
+        _format_governor_report(row, percentages[i], statuses[i]) for i, row in enumerate(rows)
+    ]
+
+def _format_governor_report(ops_data: Dict[str, Any], percentages, statuses) -> str:
+    """Render the report for one snapshot from its precomputed percentages and statuses"""
+    report_parts = ["📊 **GOVERNOR LIMITS ANALYSIS**\n\n"]
     
     warnings = []
     critical_issues = []
     
     for operation, used in ops_data.items():
-        if operation in sync_limits:
-            limit = sync_limits[operation]
-            percentage = (used / limit) * 100
+        if operation in _LIMIT_INDEX:
+            index = _LIMIT_INDEX[operation]
+            limit = SYNC_LIMITS[operation]
+            percentage = percentages[index]
+            status = statuses[index]
             
-            status = "🟢"
-            if percentage > 80:
-                status = "🔴"
+            if status == STATUS_CRITICAL:
                 critical_issues.append(f"{operation}: {used}/{limit} ({percentage:.1f}%)")
-            elif percentage > 60:
-                status = "🟡"
+            elif status == STATUS_WARNING:
                 warnings.append(f"{operation}: {used}/{limit} ({percentage:.1f}%)")
             
-            report += f"{status} **{operation.replace('_', ' ').title()}:** {used}/{limit} ({percentage:.1f}%)\n"
+            report_parts.append(f"{_STATUS_ICONS[status]} **{operation.replace('_', ' ').title()}:** {used}/{limit} ({percentage:.1f}%)\n")
     
-    report += "\n"
+    report_parts.append("\n")
     
     if critical_issues:
-        report += "🚨 **CRITICAL - NEAR LIMITS:**\n"
-        for issue in critical_issues:
-            report += f"• {issue}\n"
-        report += "\n"
+        report_parts.append("🚨 **CRITICAL - NEAR LIMITS:**\n")
+        report_parts.extend(f"• {issue}\n" for issue in critical_issues)
+        report_parts.append("\n")
     
     if warnings:
-        report += "⚠️ **WARNINGS:**\n"
-        for warning in warnings:
-            report += f"• {warning}\n"
-        report += "\n"
+        report_parts.append("⚠️ **WARNINGS:**\n")
+        report_parts.extend(f"• {warning}\n" for warning in warnings)
+        report_parts.append("\n")
     
     # Provide specific recommendations
-    report += "💡 **RECOMMENDATIONS:**\n"
+    report_parts.append("💡 **RECOMMENDATIONS:**\n")
     
     if 'soql_queries' in ops_data and ops_data['soql_queries'] > 50:
-        report += "• High SOQL usage - Consider query optimization and caching\n"
+        report_parts.append("• High SOQL usage - Consider query optimization and caching\n")
     
     if 'dml_statements' in ops_data and ops_data['dml_statements'] > 100:
-        report += "• High DML usage - Implement bulk operations and reduce individual DML calls\n"
+        report_parts.append("• High DML usage - Implement bulk operations and reduce individual DML calls\n")
     
     if 'heap_size_mb' in ops_data and ops_data['heap_size_mb'] > 4:
-        report += "• High heap usage - Optimize data structures and consider processing in batches\n"
+        report_parts.append("• High heap usage - Optimize data structures and consider processing in batches\n")
     
-    report += "• Always test with large data volumes\n"
-    report += "• Implement proper error handling for limit exceptions\n"
-    report += "• Consider asynchronous processing for large operations\n"
+    report_parts.append(_GOVERNOR_LIMITS_TAIL)
     
-    report += "\n📚 **GOVERNOR LIMITS REFERENCE:**\n"
-    report += "• SOQL Queries: 100 (sync) / 200 (async)\n"
-    report += "• DML Statements: 150 (sync) / 150 (async)\n"
-    report += "• DML Records: 10,000 per transaction\n"
-    report += "• Heap Size: 6 MB (sync) / 12 MB (async)\n"
-    report += "• CPU Time: 10s (sync) / 60s (async)\n"
+    return "".join(report_parts)
+
+def _scan_apex_markers(code: str) -> List[Tuple[int, str]]:
+    """Offsets and kinds (loop type, soql, dml) of every rule match in the source, in order"""
+    # Hyperscan works on bytes; its offsets only line up with str offsets for ASCII
+    database = _hyperscan_database() if code.isascii() else None
+    if database is not None:
+        scratch = getattr(_hs_local, 'scratch', None)
+        if scratch is None:
+            scratch = _hs_local.scratch = hyperscan.Scratch(database)
+        markers = []
+        
+        def on_match(expression_id, start, end, flags, context):
+            markers.append((start, _HS_EXPRESSIONS[expression_id][0]))
+        
+        database.scan(code.encode('ascii'), match_event_handler=on_match, scratch=scratch)
+        markers.sort()
+        return markers
+    
+    if code.isascii():
+        matches = _APEX_SCAN_ASCII_RE.finditer(code.lower())
+    else:
+        matches = _APEX_SCAN_RE.finditer(code)
+    return [(match.start(), match.lastgroup) for match in matches]
+
+def _is_salesforce_id(candidate: str) -> bool:
+    """Check that a 15/18 character literal is shaped like a record ID rather than a word"""
+    # Record IDs always carry digits; identifiers like 'AccountNameField' don't
+    if candidate.isalpha():
+        return False
+    if len(candidate) == 15:
+        return True
+    # The 18 character form ends in a checksum of the case of the first 15
+    checksum = ''.join(
+        _ID_CHECKSUM_CHARS[sum(1 << bit for bit, char in enumerate(candidate[start:start + 5]) if char.isupper())]
+        for start in (0, 5, 10)
+    )
+    return candidate[15:].upper() == checksum
+
+def score_limit_usage(used, limits):
+    """Vectorized usage percentages and status codes for bulk governor limit checks"""
+    import numpy as np
+    
+    limits = np.asarray(limits, dtype=np.float64)
+    return _score_usage(
+        np.asarray(used, dtype=np.float64), 100.0 / limits,
+        limits * WARNING_USAGE_PERCENT / 100, limits * CRITICAL_USAGE_PERCENT / 100
+    )
+
+def _score_usage(used, reciprocals, warning_at, critical_at):
+    """Percentages by multiplying with precomputed reciprocals; statuses by comparing raw usage"""
+    import numpy as np
+    
+    percentages = used * reciprocals
+    # Thresholds are exact usage amounts, so a value right on a boundary is never
+    # pushed over it by rounding in the percentage
+    status = (used > warning_at).astype(np.uint8)
+    status += used > critical_at
+    return percentages, status
+
+def _scan_soql(query_lower: str) -> Dict[str, List[int]]:
+    """Collect the offsets of each SOQL keyword in one pass over the query"""
+    offsets = {}
+    for match in _SOQL_KEYWORD_RE.finditer(query_lower):
+        keyword = match.group()
+        if match.group(1):
+            keyword = 'from'
+            offsets.setdefault('from ' + match.group(1), []).append(match.start())
+        offsets.setdefault(keyword, []).append(match.start())
+    return offsets
+
+@lru_cache(maxsize=None)
+def _tool_schemas() -> Dict[str, Any]:
+    """Argument schemas, declared explicitly so building the tools needs no signature or
+    docstring introspection (pydantic loads on first use)"""
+    from pydantic import BaseModel, Field
+    
+    class ApexCodeInput(BaseModel):
+        code: str = Field(description="The Apex code to review")
+    
+    class SoqlQueryInput(BaseModel):
+        query: str = Field(description="The SOQL query to analyze and optimize")
+    
+    class GovernorOperationsInput(BaseModel):
+        operations: Union[str, Dict[str, Any]] = Field(
+            description='JSON string, dict of counts, or description of operations (e.g., \'{"soql_queries": 50, "dml_statements": 150, "heap_size_mb": 5}\')'
+        )
+    
+    return {
+        'ApexCodeInput': ApexCodeInput,
+        'SoqlQueryInput': SoqlQueryInput,
+        'GovernorOperationsInput': GovernorOperationsInput,
+    }
+
+_APEX_REVIEWER_DESCRIPTION = (
+    "Review Apex code for best practices, governor limits compliance, and potential issues. "
+    "Returns a detailed review with recommendations and best practices."
+)
+_SOQL_OPTIMIZER_DESCRIPTION = (
+    "Analyze and optimize SOQL queries for performance and best practices. "
+    "Returns analysis and optimization recommendations for the SOQL query."
+)
+_GOVERNOR_CALCULATOR_DESCRIPTION = (
+    "Calculate governor limits usage for given operations and provide guidance. "
+    "Returns governor limits analysis and recommendations."
+)
+
+def _build_tool(name: str, description: str, args_schema, impl, in_thread: bool = False):
+    """Wrap a tool implementation with its prebuilt schema; async tools run it in a worker thread"""
+    from langchain_core.tools import StructuredTool
     
-    return report
+    if in_thread:
+        async def run_in_thread(**kwargs) -> str:
+            return await asyncio.to_thread(impl, **kwargs)
+        
+        return StructuredTool.from_function(
+            coroutine=run_in_thread, name=name, description=description,
+            args_schema=args_schema, infer_schema=False
+        )
+    return StructuredTool.from_function(
+        func=impl, name=name, description=description,
+        args_schema=args_schema, infer_schema=False
+    )
+
+@lru_cache(maxsize=None)
+def _lazy_tools() -> Dict[str, Any]:
+    """Build the LangChain tools on first access; importing langchain_core dominates module import time"""
+    schemas = _tool_schemas()
+    ApexCodeInput = schemas['ApexCodeInput']
+    SoqlQueryInput = schemas['SoqlQueryInput']
+    GovernorOperationsInput = schemas['GovernorOperationsInput']
+    
+    apex_code_reviewer = _build_tool(
+        "apex_code_reviewer", _APEX_REVIEWER_DESCRIPTION, ApexCodeInput, _review_apex_code
+    )
+    soql_query_optimizer = _build_tool(
+        "soql_query_optimizer", _SOQL_OPTIMIZER_DESCRIPTION, SoqlQueryInput, _optimize_soql_query
+    )
+    governor_limits_calculator = _build_tool(
+        "governor_limits_calculator", _GOVERNOR_CALCULATOR_DESCRIPTION, GovernorOperationsInput, _calculate_governor_limits
+    )
+    
+    # Async variants run the same cached implementations in a worker thread, so an
+    # agent calling several tools in one turn can await them concurrently
+    apex_code_reviewer_async = _build_tool(
+        "apex_code_reviewer_async", _APEX_REVIEWER_DESCRIPTION, ApexCodeInput, _review_apex_code, in_thread=True
+    )
+    soql_query_optimizer_async = _build_tool(
+        "soql_query_optimizer_async", _SOQL_OPTIMIZER_DESCRIPTION, SoqlQueryInput, _optimize_soql_query, in_thread=True
+    )
+    governor_limits_calculator_async = _build_tool(
+        "governor_limits_calculator_async", _GOVERNOR_CALCULATOR_DESCRIPTION, GovernorOperationsInput,
+        _calculate_governor_limits, in_thread=True
+    )
+    
+    return {
+        'apex_code_reviewer': apex_code_reviewer,
+        'soql_query_optimizer': soql_query_optimizer,
+        'governor_limits_calculator': governor_limits_calculator,
+        'apex_code_reviewer_async': apex_code_reviewer_async,
+        'soql_query_optimizer_async': soql_query_optimizer_async,
+        'governor_limits_calculator_async': governor_limits_calculator_async,
+        # List of all tools for easy import
+        'salesforce_tools': [apex_code_reviewer, soql_query_optimizer, governor_limits_calculator],
+        'salesforce_tools_async': [apex_code_reviewer_async, soql_query_optimizer_async, governor_limits_calculator_async],
+    }
+
+# Module attributes built on first lookup
+_LAZY_TOOL_NAMES = frozenset({
+    'apex_code_reviewer', 'soql_query_optimizer', 'governor_limits_calculator',
+    'apex_code_reviewer_async', 'soql_query_optimizer_async', 'governor_limits_calculator_async',
+    'salesforce_tools', 'salesforce_tools_async',
+})
+_SCHEMA_NAMES = frozenset({'ApexCodeInput', 'SoqlQueryInput', 'GovernorOperationsInput'})
 
-# List of all tools for easy import
-salesforce_tools = [apex_code_reviewer, soql_query_optimizer, governor_limits_calculator]
\ No newline at end of file
+def __getattr__(name: str):
+    # Only the known names trigger a build; probes such as __path__ or __wrapped__
+    # from inspect and doctest fail fast without importing langchain_core
+    if name in _LAZY_TOOL_NAMES:
+        return _lazy_tools()[name]
+    if name in _SCHEMA_NAMES:
+        return _tool_schemas()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,30 @@
 import streamlit as st
+import functools
 import time
+from collections import deque
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.outputs import LLMResult
 from langchain_core.messages import BaseMessage
 
+# Rough estimation when a response carries no usage data: ~4 characters per
+# token for English text, and about a third as many input tokens as output
+ESTIMATED_CHARS_PER_TOKEN = 4
+ESTIMATED_OUTPUT_INPUT_RATIO = 3
+# Fixed fields of an estimated usage record; the counts and times are filled in per call
+ESTIMATED_USAGE_TEMPLATE = {
+    'input_tokens': 0,
+    'output_tokens': 0,
+    'total_tokens': 0,
+    'model': 'gemini-1.5-flash',  # Default model
+    'response_time': 0.0,
+    'timestamp': 0.0,
+    'estimated': True
+}
+# Number of recent calls kept in the session's detailed history
+MAX_DETAILED_CALLS = 50
+
 class TokenUsageTracker(BaseCallbackHandler):
     """LLM-agnostic token usage and cost tracker"""
     
@@ -26,8 +45,27 @@ class TokenUsageTracker(BaseCallbackHandler):
         "claude-3-haiku": {"input": 0.00025, "output": 0.00125},  # $0.25/$1.25 per 1M tokens
     }
     
+    # The same rates per single token, so costing a call needs no division
+    PER_TOKEN_PRICING = {
+        model: {"input": rates["input"] / 1000, "output": rates["output"] / 1000}
+        for model, rates in MODEL_PRICING.items()
+    }
+    
+    # Model name fragment -> pricing key, checked in order (first match wins)
+    MODEL_NAME_RULES = (
+        ("flash", "gemini-1.5-flash"),
+        ("gemini-1.5-pro", "gemini-1.5-pro"),
+        ("gemini", "gemini-pro"),
+        ("gpt-4o-mini", "gpt-4o-mini"),
+        ("gpt-4o", "gpt-4o"),
+        ("gpt-3.5", "gpt-3.5-turbo"),
+        ("claude-3-5-sonnet", "claude-3-5-sonnet"),
+        ("claude-3-haiku", "claude-3-haiku"),
+    )
+    
     def __init__(self):
         super().__init__()
+        self._pricing_by_model = {}
         # Initialize session state for tracking
         if 'token_usage' not in st.session_state:
             st.session_state.token_usage = {
@@ -37,7 +75,7 @@ class TokenUsageTracker(BaseCallbackHandler):
                 'query_count': 0,
                 'model_usage': {},
                 'session_start': datetime.now().isoformat(),
-                'detailed_calls': []
+                'detailed_calls': deque(maxlen=MAX_DETAILED_CALLS)
             }
     
     def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs) -> None:
@@ -73,7 +111,7 @@ class TokenUsageTracker(BaseCallbackHandler):
         try:
             # Try to get usage metadata from response
             if hasattr(response, 'llm_output') and response.llm_output:
-                usage = response.llm_output.get('usage', {})
+                usage = response.llm_output.get('usage')
                 if usage:
                     return {
                         'input_tokens': usage.get('prompt_tokens', 0),
@@ -81,23 +119,26 @@ class TokenUsageTracker(BaseCallbackHandler):
                         'total_tokens': usage.get('total_tokens', 0),
                         'model': response.llm_output.get('model_name', 'unknown'),
                         'response_time': response_time,
-                        'timestamp': datetime.now().isoformat()
+                        'timestamp': time.time()
                     }
             
             # For Google Gemini, try alternative extraction methods
             for generation in response.generations:
                 for gen in generation:
-                    if hasattr(gen, 'generation_info') and gen.generation_info:
-                        usage = gen.generation_info.get('usage_metadata', {})
-                        if usage:
-                            return {
-                                'input_tokens': usage.get('prompt_token_count', 0),
-                                'output_tokens': usage.get('candidates_token_count', 0),
-                                'total_tokens': usage.get('total_token_count', 0),
-                                'model': 'gemini-2.0-flash-exp',  # Match current model
-                                'response_time': response_time,
-                                'timestamp': datetime.now().isoformat()
-                            }
+                    info = getattr(gen, 'generation_info', None)
+                    if not info:
+                        continue
+                    usage = info.get('usage_metadata')
+                    if not usage:
+                        continue
+                    return {
+                        'input_tokens': usage.get('prompt_token_count', 0),
+                        'output_tokens': usage.get('candidates_token_count', 0),
+                        'total_tokens': usage.get('total_token_count', 0),
+                        'model': 'gemini-2.0-flash-exp',  # Match current model
+                        'response_time': response_time,
+                        'timestamp': time.time()
+                    }
             
             # Fallback: estimate tokens if no usage data available
             return self._estimate_token_usage(response, response_time)
@@ -107,32 +148,28 @@ class TokenUsageTracker(BaseCallbackHandler):
     
     def _estimate_token_usage(self, response: LLMResult, response_time: float) -> Dict:
         """Estimate token usage when exact counts aren't available"""
-        # Rough estimation: ~4 characters per token for English text
-        total_chars = 0
-        for generation in response.generations:
-            for gen in generation:
-                total_chars += len(gen.text)
-        
-        estimated_output_tokens = max(1, total_chars // 4)
-        estimated_input_tokens = max(1, estimated_output_tokens // 3)  # Rough ratio
-        
-        return {
-            'input_tokens': estimated_input_tokens,
-            'output_tokens': estimated_output_tokens,
-            'total_tokens': estimated_input_tokens + estimated_output_tokens,
-            'model': 'gemini-1.5-flash',  # Default model
-            'response_time': response_time,
-            'timestamp': datetime.now().isoformat(),
-            'estimated': True
-        }
+        total_chars = sum(len(gen.text) for generation in response.generations for gen in generation)
+        
+        estimated_output_tokens = max(1, total_chars // ESTIMATED_CHARS_PER_TOKEN)
+        estimated_input_tokens = max(1, estimated_output_tokens // ESTIMATED_OUTPUT_INPUT_RATIO)
+        
+        token_info = ESTIMATED_USAGE_TEMPLATE.copy()
+        token_info['input_tokens'] = estimated_input_tokens
+        token_info['output_tokens'] = estimated_output_tokens
+        token_info['total_tokens'] = estimated_input_tokens + estimated_output_tokens
+        token_info['response_time'] = response_time
+        token_info['timestamp'] = time.time()
+        return token_info
     
     def _update_session_stats(self, token_info: Dict):
         """Update session statistics with new token usage"""
         stats = st.session_state.token_usage
+        input_tokens = token_info['input_tokens']
+        output_tokens = token_info['output_tokens']
         
         # Update totals
-        stats['total_input_tokens'] += token_info['input_tokens']
-        stats['total_output_tokens'] += token_info['output_tokens']
+        stats['total_input_tokens'] += input_tokens
+        stats['total_output_tokens'] += output_tokens
         stats['query_count'] += 1
         
         # Calculate cost
@@ -142,78 +179,72 @@ class TokenUsageTracker(BaseCallbackHandler):
             cost = token_info['cost']
         else:
             # Calculate cost from tokens
-            cost = self._calculate_cost(
-                token_info['input_tokens'], 
-                token_info['output_tokens'], 
-                model
-            )
+            cost = self._calculate_cost(input_tokens, output_tokens, model)
         stats['total_cost'] += cost
         token_info['cost'] = cost
         
         # Update model usage stats
-        if model not in stats['model_usage']:
-            stats['model_usage'][model] = {
+        model_usage = stats['model_usage']
+        model_stats = model_usage.get(model)
+        if model_stats is None:
+            model_stats = model_usage[model] = {
                 'calls': 0,
                 'input_tokens': 0,
                 'output_tokens': 0,
                 'cost': 0.0
             }
         
-        model_stats = stats['model_usage'][model]
         model_stats['calls'] += 1
-        model_stats['input_tokens'] += token_info['input_tokens']
-        model_stats['output_tokens'] += token_info['output_tokens']
+        model_stats['input_tokens'] += input_tokens
+        model_stats['output_tokens'] += output_tokens
         model_stats['cost'] += cost
         
-        # Store detailed call info (keep last 50)
-        stats['detailed_calls'].append(token_info)
-        if len(stats['detailed_calls']) > 50:
-            stats['detailed_calls'].pop(0)
+        # Store detailed call info, keeping only the most recent calls. The
+        # history may have been seeded elsewhere as a plain list, so bound it here
+        detailed_calls = stats['detailed_calls']
+        if not isinstance(detailed_calls, deque) or detailed_calls.maxlen != MAX_DETAILED_CALLS:
+            detailed_calls = stats['detailed_calls'] = deque(detailed_calls, maxlen=MAX_DETAILED_CALLS)
+        detailed_calls.append(token_info)
     
     def _calculate_cost(self, input_tokens: int, output_tokens: int, model: str) -> float:
         """Calculate cost based on token usage and model pricing"""
+        # Resolving a model name to its pricing is the same every call, so remember it per name
+        pricing = self._pricing_by_model.get(model)
+        if pricing is None:
+            pricing = self._pricing_by_model[model] = self._lookup_pricing(model)
+        
+        return input_tokens * pricing['input'] + output_tokens * pricing['output']
+    
+    def _lookup_pricing(self, model: str) -> Dict[str, float]:
+        """Per-token pricing entry for a model name"""
         # Normalize model name for pricing lookup
         model_key = self._normalize_model_name(model)
         
-        if model_key not in self.MODEL_PRICING:
+        if model_key not in self.PER_TOKEN_PRICING:
             # Use default Gemini pricing for unknown models
             model_key = "gemini-1.5-flash"
         
-        pricing = self.MODEL_PRICING[model_key]
-        
-        # Convert per-1K pricing to per-token
-        input_cost = (input_tokens / 1000) * pricing['input']
-        output_cost = (output_tokens / 1000) * pricing['output']
-        
-        return input_cost + output_cost
+        return self.PER_TOKEN_PRICING[model_key]
     
     def _normalize_model_name(self, model: str) -> str:
         """Normalize model name for pricing lookup"""
         model_lower = model.lower()
         
         # Map various model name formats to pricing keys
-        if 'gemini-1.5-flash' in model_lower or 'flash' in model_lower:
-            return 'gemini-1.5-flash'
-        elif 'gemini-1.5-pro' in model_lower:
-            return 'gemini-1.5-pro'
-        elif 'gemini' in model_lower:
-            return 'gemini-pro'
-        elif 'gpt-4o-mini' in model_lower:
-            return 'gpt-4o-mini'
-        elif 'gpt-4o' in model_lower:
-            return 'gpt-4o'
-        elif 'gpt-3.5' in model_lower:
-            return 'gpt-3.5-turbo'
-        elif 'claude-3-5-sonnet' in model_lower:
-            return 'claude-3-5-sonnet'
-        elif 'claude-3-haiku' in model_lower:
-            return 'claude-3-haiku'
-        
-        return 'gemini-1.5-flash'  # Default fallback
+        return next(
+            (key for fragment, key in self.MODEL_NAME_RULES if fragment in model_lower),
+            'gemini-1.5-flash'  # Default fallback
+        )
     
     def get_session_stats(self) -> Dict[str, Any]:
-        """Get current session statistics"""
-        return st.session_state.token_usage.copy()
+        """Get a snapshot of the current session statistics"""
+        stats = st.session_state.token_usage.copy()
+        # Copy the nested containers too (one small dict per model), so callers
+        # can't mutate the live totals through the snapshot
+        stats['model_usage'] = {model: dict(usage) for model, usage in stats['model_usage'].items()}
+        # Callers slice and serialize the call history, so hand it out as a list
+        stats['detailed_calls'] = list(stats['detailed_calls'])
+        return stats
     
     def reset_session_stats(self):
         """Reset session statistics"""
@@ -224,22 +255,30 @@ class TokenUsageTracker(BaseCallbackHandler):
             'query_count': 0,
             'model_usage': {},
             'session_start': datetime.now().isoformat(),
-            'detailed_calls': []
+            'detailed_calls': deque(maxlen=MAX_DETAILED_CALLS)
         }
 
-# Global token tracker instance
-token_tracker = TokenUsageTracker()
+def iso_timestamp(timestamp: float) -> str:
+    """Format a recorded call timestamp (seconds since the epoch) for display"""
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+@functools.lru_cache(maxsize=None)
+def get_token_tracker() -> TokenUsageTracker:
+    """Shared token tracker, created on first use so importing this module doesn't touch session state"""
+    return TokenUsageTracker()
 
 def track_tokens(func):
     """Decorator to add token tracking to functions"""
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Add callback to kwargs if supported
-        if 'callbacks' in kwargs:
-            if not isinstance(kwargs['callbacks'], list):
-                kwargs['callbacks'] = []
-            kwargs['callbacks'].append(token_tracker)
+        # Add callback to kwargs if supported; build a new list rather than
+        # appending to one the caller may reuse
+        callbacks = kwargs.get('callbacks')
+        tracker = get_token_tracker()
+        if isinstance(callbacks, list):
+            kwargs['callbacks'] = [*callbacks, tracker]
         else:
-            kwargs['callbacks'] = [token_tracker]
+            kwargs['callbacks'] = [tracker]
         
         return func(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -19,21 +19,19 @@ def inspect_chromadb(persist_directory: str = "data/vectorstore", collection_nam
         # Try to get the specific collection
         try:
             collection = client.get_collection(collection_name)
+            document_count = collection.count()
             print(f"Collection: {collection.name}")
-            print(f"Document count: {collection.count()}")
+            print(f"Document count: {document_count}")
             
-            # Get sample documents
-            if collection.count() > 0:
-                results = collection.peek(limit=5)
+            # Get sample documents (peek() would also pull every embedding vector)
+            if document_count > 0:
+                results = collection.get(limit=5, include=['metadatas', 'documents'])
+                ids, metadatas, documents = results['ids'], results['metadatas'], results['documents']
                 print("\nSample documents:")
-                for i, (doc_id, metadata, document) in enumerate(zip(
-                    results['ids'], 
-                    results['metadatas'], 
-                    results['documents']
-                )):
-                    print(f"{i+1}. ID: {doc_id}")
-                    print(f"   Metadata: {metadata}")
-                    print(f"   Content: {document[:100]}...")
+                for i in range(len(ids)):
+                    print(f"{i+1}. ID: {ids[i]}")
+                    print(f"   Metadata: {metadatas[i]}")
+                    print(f"   Content: {documents[i][:100]}...")
             else:
                 print("Collection is empty!")
                 
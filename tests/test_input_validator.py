@@ -0,0 +1,34 @@
+from src.input_validator import InputValidator
+
+validator = InputValidator()
+
+
+def _rejected(question):
+    return not validator.validate_question(question)[0]
+
+
+def test_quote_followed_by_comment_is_rejected():
+    assert _rejected("admin' --")
+    assert _rejected('x" --')
+
+
+def test_semicolon_comment_is_rejected():
+    assert _rejected("SELECT Name FROM Account; -- drop the rest")
+
+
+def test_literal_script_tag_is_rejected():
+    # Checks run on the raw text, so the tag is seen before it is escaped
+    assert _rejected("What does <script>alert(1)</script> do in Visualforce?")
+
+
+def test_ampersand_before_dashes_is_accepted():
+    # Only matched before because escaping turned & into &amp; (ending in ';')
+    is_valid, _, cleaned = validator.validate_question("Compare Apex & Flow -- which is faster?")
+    assert is_valid
+    assert cleaned == "Compare Apex &amp; Flow -- which is faster?"
+
+
+def test_plain_question_is_accepted_and_escaped():
+    is_valid, message, cleaned = validator.validate_question("  How do I bulkify a <trigger>?  ")
+    assert is_valid and message == "Valid"
+    assert cleaned == "How do I bulkify a &lt;trigger&gt;?"
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from src.rate_limiter import RateLimiter
+
+
+def _limiter_for(monkeypatch, user_id):
+    limiter = RateLimiter()
+    monkeypatch.setattr(limiter, "get_user_id", lambda: user_id)
+    return limiter
+
+
+def test_sweep_removes_idle_users(monkeypatch):
+    limiter = _limiter_for(monkeypatch, "idle")
+    assert limiter.is_allowed()[0]
+    
+    # Two hours later the user's last request is outside every window
+    limiter._sweep_idle_users(time.time() + 7200)
+    
+    assert "idle" not in limiter.requests
+    assert "idle" not in limiter.minute_requests
+    assert "idle" not in limiter.locks
+
+
+def test_sweep_keeps_user_with_request_in_flight(monkeypatch):
+    limiter = _limiter_for(monkeypatch, "busy")
+    looked_up = threading.Event()
+    sweep_done = threading.Event()
+    check_and_record = limiter._check_and_record
+    
+    def paused_check(*args):
+        # The entries are fetched from the registry; stop before the user lock is taken
+        looked_up.set()
+        sweep_done.wait(5)
+        return check_and_record(*args)
+    
+    monkeypatch.setattr(limiter, "_check_and_record", paused_check)
+    request = threading.Thread(target=limiter.is_allowed)
+    request.start()
+    assert looked_up.wait(5)
+    
+    limiter._sweep_idle_users(time.time() + 7200)
+    assert "busy" in limiter.requests
+    
+    sweep_done.set()
+    request.join(5)
+    # The request was recorded in the deque that is still registered
+    assert len(limiter.requests["busy"]) == 1
+    assert "busy" not in limiter.pending
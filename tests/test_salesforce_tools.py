@@ -0,0 +1,51 @@
+from src.salesforce_tools import _is_salesforce_id, _optimize_soql_query, _review_apex_code
+
+
+def _flags_hardcoded_id(code):
+    return "Hardcoded Salesforce IDs detected" in _review_apex_code(code)
+
+
+def test_valid_15_char_id_is_flagged():
+    assert _is_salesforce_id("001D000000IqhSL")
+    assert _flags_hardcoded_id("public class A { Id accountId = '001D000000IqhSL'; }")
+
+
+def test_valid_18_char_id_is_flagged():
+    assert _is_salesforce_id("001D000000IqhSLIAZ")
+    assert _flags_hardcoded_id('public class A { Id accountId = "001D000000IqhSLIAZ"; }')
+
+
+def test_18_char_id_with_bad_checksum_is_not_flagged():
+    assert not _is_salesforce_id("001D000000IqhSLAAA")
+    assert not _flags_hardcoded_id("public class A { String s = '001D000000IqhSLAAA'; }")
+
+
+def test_unquoted_long_identifier_is_not_flagged():
+    # Shaped like a 15 character ID, but it is code rather than a string literal
+    assert not _flags_hardcoded_id("public class A { Integer myIdentifier123 = 0; }")
+
+
+def test_all_letter_string_is_not_flagged():
+    assert not _is_salesforce_id("AccountNameFiel")
+    assert not _flags_hardcoded_id("public class A { String s = 'AccountNameFiel'; }")
+
+
+def test_where_clause_ends_at_group_by():
+    report = _optimize_soql_query(
+        "SELECT CALENDAR_YEAR(CreatedDate) y, SUM(Amount) FROM Opportunity "
+        "WHERE Amount > 100 GROUP BY CALENDAR_YEAR(CreatedDate)"
+    )
+    assert "Date functions in WHERE clause" not in report
+
+
+def test_where_clause_ends_at_limit():
+    # The bind variable after LIMIT mentions "Id" but is not a WHERE filter
+    report = _optimize_soql_query("SELECT Name FROM Account WHERE Industry = 'Tech' LIMIT :maxRecordId")
+    assert "Consider using indexed fields in WHERE clause" in report
+
+
+def test_date_function_inside_where_clause_is_flagged():
+    report = _optimize_soql_query(
+        "SELECT Id FROM Opportunity WHERE CALENDAR_YEAR(CreatedDate) = 2020 GROUP BY Id"
+    )
+    assert "Date functions in WHERE clause" in report
@@ -0,0 +1,36 @@
+import streamlit as st
+
+from src.token_tracker import MAX_DETAILED_CALLS, TokenUsageTracker
+
+
+class _SessionState(dict):
+    """Minimal stand-in for st.session_state (attribute and key access)"""
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+def test_detailed_calls_capped_when_seeded_as_list(monkeypatch):
+    # app.py seeds the session before the tracker exists, with a plain list
+    monkeypatch.setattr(st, "session_state", _SessionState(token_usage={
+        'total_input_tokens': 0,
+        'total_output_tokens': 0,
+        'total_cost': 0.0,
+        'query_count': 0,
+        'model_usage': {},
+        'session_start': '',
+        'detailed_calls': []
+    }))
+    tracker = TokenUsageTracker()
+
+    for i in range(MAX_DETAILED_CALLS + 25):
+        tracker._update_session_stats({
+            'input_tokens': i,
+            'output_tokens': 1,
+            'model': 'gemini-1.5-flash',
+            'timestamp': float(i)
+        })
+
+    calls = st.session_state.token_usage['detailed_calls']
+    assert len(calls) == MAX_DETAILED_CALLS
+    assert calls[-1]['input_tokens'] == MAX_DETAILED_CALLS + 24
+    assert st.session_state.token_usage['query_count'] == MAX_DETAILED_CALLS + 25